@@ -0,0 +1,236 @@
+"""Throughput benchmarks for agents, infradistributions and environments.
+
+Run all benchmarks and compare against the saved baseline:
+
+    python -m benchmarks.run_benchmarks
+
+Record a new baseline on the current machine:
+
+    python -m benchmarks.run_benchmarks --save-baseline
+
+Every metric is a rate (operations per second, higher is better). The run
+fails with exit code 1 if any metric drops more than ``--threshold`` below
+its baseline value. Baselines are machine-specific and not committed; CI
+jobs should record one on their runner and pass ``--require-baseline`` so
+that a missing baseline fails instead of silently passing:
+
+    python -m benchmarks.run_benchmarks --baseline ci_baseline.json --require-baseline
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import torch as th
+import torch.distributions as thd
+from typing import Callable, Dict, Optional
+from src import InfrabayesianRLAgent, ClassicalRLAgent, NewcombEnvironment, InfraPolytope
+from src.utils import run_experiment
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+def measure_rate(fn: Callable[[], None], ops_per_call: int = 1, min_time: float = 0.2,
+                 repeats: int = 3) -> float:
+    """Best-of-``repeats`` throughput of ``fn`` in operations per second."""
+    fn()  # warm-up
+    best = 0.0
+    for _ in range(repeats):
+        calls = 0
+        start = time.perf_counter()
+        elapsed = 0.0
+        while elapsed < min_time:
+            fn()
+            calls += 1
+            elapsed = time.perf_counter() - start
+        best = max(best, calls * ops_per_call / elapsed)
+    return best
+
+def _trained_agent(agent_cls, episodes: int = 50):
+    th.manual_seed(0)
+    agent = agent_cls([0, 1])
+    env = NewcombEnvironment()
+    for _ in range(episodes):
+        state = env.reset()
+        action = agent.select_action(state)
+        next_state, reward, _, _ = env.step(action)
+        agent.update(state, action, reward, next_state)
+    return agent
+
+def bench_agents(min_time: float) -> Dict[str, float]:
+    """Agent decisions/sec and Bellman updates/sec."""
+    results = {}
+    for name, agent_cls in [('ib', InfrabayesianRLAgent), ('classical', ClassicalRLAgent)]:
+        agent = _trained_agent(agent_cls)
+        results[f'agent.{name}.decisions_per_s'] = measure_rate(
+            lambda: agent.select_action(0), min_time=min_time)
+        results[f'agent.{name}.updates_per_s'] = measure_rate(
+            lambda: agent.update(0, 0, 1000000.0, 0), min_time=min_time)
+    return results
+
+def bench_infrapolytope(min_time: float) -> Dict[str, float]:
+    """InfraPolytope evaluations/sec versus batch size and quadrature order."""
+    results = {}
+    for batch in [3, 64, 1024]:
+        for order in [5, 20, 50]:
+            means = th.linspace(-1, 1, batch)
+            polytope = InfraPolytope(thd.Normal(means, th.ones(batch)))
+            f = lambda x: x ** 2
+            measure = polytope._batched_measure
+            results[f'infrapolytope.batch{batch}.n{order}.evals_per_s'] = measure_rate(
+                lambda: measure(f, n=order).min(dim=0), min_time=min_time)
+    return results
+
+def bench_environment(min_time: float) -> Dict[str, float]:
+    """Environment steps/sec versus accumulated history length."""
+    results = {}
+    for history in [10, 1000, 10000]:
+        th.manual_seed(0)
+        env = NewcombEnvironment()
+        env.agent_history = [0] * history
+        env.prediction_history = [0] * history
+
+        def step():
+            env.step(0)
+            # Keep the history length fixed
+            env.agent_history.pop()
+            env.prediction_history.pop()
+
+        results[f'env.history{history}.steps_per_s'] = measure_rate(step, min_time=min_time)
+    return results
+
+def bench_end_to_end(min_time: float) -> Dict[str, float]:
+    """Episodes/sec of full run_experiment loops."""
+    results = {}
+    episodes = 100
+    for name, agent_cls in [('ib', InfrabayesianRLAgent), ('classical', ClassicalRLAgent)]:
+        def run():
+            th.manual_seed(0)
+            run_experiment(agent_cls([0, 1]), NewcombEnvironment(), episodes=episodes,
+                           verbose=False)
+        results[f'run_experiment.{name}.episodes_per_s'] = measure_rate(
+            run, ops_per_call=episodes, min_time=min_time, repeats=2)
+    return results
+
+def bench_planner(min_time: float) -> Dict[str, float]:
+    """Infra-Bellman backups/sec over a random tabular credal model."""
+    from src.planning import InfraValueIteration
+    results = {}
+    for states in [10, 200]:
+        gen = th.Generator().manual_seed(0)
+        probs = th.rand(3, states, 4, states, generator=gen)
+        probs = probs / probs.sum(-1, keepdim=True)
+        planner = InfraValueIteration.from_probs(probs, th.rand(states, 4, generator=gen))
+        values = th.zeros(states)
+        results[f'planner.states{states}.backups_per_s'] = measure_rate(
+            lambda: planner.bellman_backup(values), min_time=min_time)
+    return results
+
+def bench_kernels(min_time: float) -> Dict[str, float]:
+    """Fused infra-Bellman backup: eager vs compiled, single and batched."""
+    from src.kernels import FusedBackup
+    results = {}
+    for backend in ['eager', 'script']:
+        backup = FusedBackup(backend)
+        for batch in [1, 1024]:
+            gen = th.Generator().manual_seed(0)
+            args = [th.rand(batch, dtype=th.float64, generator=gen),
+                    th.rand(batch, 2, dtype=th.float64, generator=gen),
+                    th.randint(1, 10, (batch, 2), generator=gen).double(),
+                    th.rand(batch, dtype=th.float64, generator=gen),
+                    th.full((batch,), 0.1, dtype=th.float64),
+                    th.full((batch,), 0.1, dtype=th.float64),
+                    th.full((batch,), 0.9, dtype=th.float64)]
+            results[f'kernel.{backend}.batch{batch}.backups_per_s'] = measure_rate(
+                lambda: backup(*args), ops_per_call=batch, min_time=min_time)
+        agent = InfrabayesianRLAgent([0, 1], compiled=backend)
+        results[f'agent.ib_fused_{backend}.updates_per_s'] = measure_rate(
+            lambda: agent.update(0, 0, 1000000.0, 0), min_time=min_time)
+    return results
+
+BENCHMARKS = {
+    'agents': bench_agents,
+    'infrapolytope': bench_infrapolytope,
+    'environment': bench_environment,
+    'end_to_end': bench_end_to_end,
+    'planner': bench_planner,
+    'kernels': bench_kernels,
+}
+
+def run_benchmarks(names: Optional[list] = None, min_time: float = 0.2) -> Dict[str, float]:
+    """Run the selected benchmark groups and return all metrics."""
+    results = {}
+    for name in names or BENCHMARKS:
+        results.update(BENCHMARKS[name](min_time))
+    return results
+
+def compare_results(current: Dict[str, float], baseline: Dict[str, float],
+                    threshold: float) -> Dict[str, float]:
+    """Metrics that regressed by more than ``threshold`` (relative change)."""
+    regressions = {}
+    for key, base in baseline.items():
+        if key in current and base > 0:
+            change = current[key] / base - 1.0
+            if change < -threshold:
+                regressions[key] = change
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON path')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='overwrite the baseline with this run')
+    parser.add_argument('--require-baseline', action='store_true',
+                        help='fail if no baseline exists for the measured metrics')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed relative slowdown before failing')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS),
+                        help='benchmark groups to run')
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='seconds spent per measurement')
+    parser.add_argument('--output', help='write this run\'s results as JSON')
+    args = parser.parse_args(argv)
+
+    th.set_num_threads(1)
+    results = run_benchmarks(args.only, args.min_time)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(f"{'metric':<48}{'current':>14}{'baseline':>14}{'change':>9}")
+    for key, value in results.items():
+        base = baseline.get(key)
+        change = f"{value / base - 1.0:>+9.1%}" if base else f"{'-':>9}"
+        base_str = f"{base:>14.1f}" if base else f"{'-':>14}"
+        print(f"{key:<48}{value:>14.1f}{base_str}{change}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({**baseline, **results}, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if not baseline:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+        return 1 if args.require_baseline else 0
+    missing = sorted(set(results) - set(baseline))
+    if missing and args.require_baseline:
+        print(f"\nNo baseline for {len(missing)} metric(s): {', '.join(missing)}")
+        return 1
+
+    regressions = compare_results(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for key, change in regressions.items():
+            print(f"  {key}: {change:+.1%}")
+        return 1
+    print(f"\nNo regressions beyond {args.threshold:.0%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""Run the experiment sweeps through a shared-directory job queue.
+
+Submit the jobs once, then start workers on every node that mounts the
+directory (``python -m src.job_queue worker <queue_dir>``), or pass
+``--workers N`` to run N local worker processes.
+"""
+import argparse
+import multiprocessing as mp
+from src.job_queue import JobQueue, make_job, run_worker
+
+def sweep_jobs(seeds: int = 5):
+    """Jobs for the sensitivity and robustness sweeps of run_experiments.py."""
+    jobs = []
+    for seed in range(seeds):
+        for radius in [0.05, 0.1, 0.2, 0.3, 0.5]:
+            jobs.append(make_job('InfrabayesianRLAgent', 'NewcombEnvironment', seed, episodes=800,
+                                 agent_kwargs={'uncertainty_radius': radius, 'learning_rate': 0.1,
+                                               'epsilon': 0.05},
+                                 env_kwargs={'predictor_accuracy': 0.9},
+                                 sweep='parameter_sensitivity'))
+        for accuracy in [0.7, 0.8, 0.9, 0.95, 0.99]:
+            for agent_type, agent_kwargs in [('InfrabayesianRLAgent', {'uncertainty_radius': 0.2}),
+                                             ('ClassicalRLAgent', {})]:
+                jobs.append(make_job(agent_type, 'NewcombEnvironment', seed, episodes=800,
+                                     agent_kwargs=agent_kwargs,
+                                     env_kwargs={'predictor_accuracy': accuracy},
+                                     sweep='robustness'))
+    return jobs
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('queue_dir')
+    parser.add_argument('--seeds', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=0, help='local worker processes to start')
+    args = parser.parse_args()
+
+    queue = JobQueue(args.queue_dir)
+    for job in sweep_jobs(args.seeds):
+        queue.submit(job)
+    print(f"Queue status: {queue.status()}")
+
+    workers = [mp.Process(target=run_worker, args=(args.queue_dir,)) for _ in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    if workers:
+        print(f"Queue status: {queue.status()}")
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import torch as th
 import numpy as np
 from src import *
 from src.utils import run_experiment, save_results, plot_comparison_results
+from src.hyperparameter_search import hyperband
 
 def parameter_sensitivity_study():
     """Study sensitivity to hyperparameters."""
@@ -40,6 +41,19 @@ def parameter_sensitivity_study():
     
     return results
 
+def hyperparameter_search(predictor_accuracy: float = 0.9):
+    """Find good agent settings for a predictor accuracy with Hyperband."""
+    print("\n=== Hyperparameter Search ===")
+    
+    result = hyperband(max_episodes=900, min_episodes=100, eta=3,
+                       env_kwargs={'predictor_accuracy': predictor_accuracy}, verbose=False)
+    
+    print(f"  Best configuration: {result.best_config}")
+    print(f"  Final average reward: {result.best_score:.0f}")
+    print(f"  Episodes trained: {result.total_episodes}")
+    
+    return {'best_config': result.best_config, 'best_score': result.best_score}
+
 def convergence_analysis():
     """Analyze convergence properties."""
     print("\n=== Convergence Analysis ===")
@@ -104,12 +118,14 @@ def main():
     
     # Run experiments
     param_results = parameter_sensitivity_study()
+    search_results = hyperparameter_search()
     convergence_results = convergence_analysis()
     robustness_results = robustness_test()
     
     # Save all results
     all_results = {
         'parameter_sensitivity': param_results,
+        'hyperparameter_search': search_results,
         'convergence': convergence_results,
         'robustness': robustness_results
     }
@@ -1,5 +1,10 @@
 from .infradistribution import InfraDistribution, InfraPolytope
-from .sa_measure import SaMeasure
+from .sa_measure import SaMeasure, SaMeasureExpr, mixture
 from .ib_rl_agent import InfrabayesianRLAgent, ClassicalRLAgent
 from .newcomb_env import NewcombEnvironment, LogicalPredictorEnv
 from .utils import run_experiment, plot_comparison_results
+from .profiling import Profiler, profile_region
+from .checkpoint import Checkpointer
+from .planning import InfraValueIteration, PlanningResult
+from .early_stopping import ConvergenceMonitor
+from .telemetry import TelemetrySink
@@ -0,0 +1,170 @@
+"""Streaming aggregation of per-seed experiment results."""
+import glob
+import os
+import pickle
+import numpy as np
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+METRICS = ('reward', 'one_box_rate')
+
+def moving_average_array(data: np.ndarray, window: int) -> np.ndarray:
+    """Vectorized ``utils.moving_average`` (expanding window at the start)."""
+    data = np.asarray(data, dtype=np.float64)
+    if len(data) < window:
+        return data
+    csum = np.concatenate([[0.0], np.cumsum(data)])
+    index = np.arange(len(data))
+    start = np.maximum(0, index - window + 1)
+    return (csum[index + 1] - csum[start]) / (index + 1 - start)
+
+def episode_series(result: Dict[str, List], window: int = 50) -> Dict[str, np.ndarray]:
+    """Per-episode smoothed reward and one-box rate of one ``run_experiment`` result."""
+    actions = np.asarray(result['actions'])
+    return {
+        'reward': moving_average_array(result['rewards'], window),
+        'one_box_rate': moving_average_array(actions == 0, window)
+    }
+
+def iter_results(paths: Iterable[str]) -> Iterator[Tuple[Dict[str, Any], Dict[str, List]]]:
+    """Yield ``(metadata, result)`` pairs from result files, one file at a time.
+
+    Accepts ``save_results`` pickles and job-queue result files, or
+    directories containing them. Job-queue files carry their job spec as
+    metadata; plain pickles carry their path.
+    """
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, '*.pkl'))) if os.path.isdir(path) else [path]
+        for filename in files:
+            with open(filename, 'rb') as f:
+                entry = pickle.load(f)
+            if 'job' in entry and 'result' in entry:
+                yield {**entry['job'], 'path': filename}, entry['result']
+            else:
+                yield {'path': filename}, entry
+
+@dataclass
+class AggregateSummary:
+    """Per-episode statistics across seeds."""
+    n_seeds: np.ndarray
+    mean: np.ndarray
+    std: np.ndarray
+    ci_low: np.ndarray
+    ci_high: np.ndarray
+    quantiles: Dict[float, np.ndarray]
+    confidence: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'n_seeds': self.n_seeds, 'mean': self.mean, 'std': self.std,
+            'ci_low': self.ci_low, 'ci_high': self.ci_high,
+            'quantiles': self.quantiles, 'confidence': self.confidence
+        }
+
+class SeedAggregator:
+    """Bounded-memory statistics over many per-seed series of one metric.
+
+    Mean and variance are accumulated with Welford's update along the
+    episode axis. Bootstrap confidence intervals use the Poisson bootstrap:
+    each seed gets an independent Poisson(1) weight in each of
+    ``n_bootstrap`` replicates, so only the replicate sums are stored.
+    Quantile bands are computed from a uniform reservoir of at most
+    ``max_samples`` values per episode, sampled independently for each
+    episode (exact while fewer seeds have reached it). Series may have
+    different lengths (e.g. early-stopped runs).
+    """
+
+    def __init__(self, n_bootstrap: int = 200, confidence: float = 0.95,
+                 quantiles: Sequence[float] = (0.05, 0.25, 0.5, 0.75, 0.95),
+                 max_samples: int = 256, seed: int = 0):
+        self.n_bootstrap = n_bootstrap
+        self.confidence = confidence
+        self.quantile_levels = tuple(quantiles)
+        self.max_samples = max_samples
+        self._rng = np.random.default_rng(seed)
+        self.seeds = 0
+        self._length = 0
+        self._count = np.zeros(0)
+        self._mean = np.zeros(0)
+        self._m2 = np.zeros(0)
+        self._boot_weight = np.zeros((n_bootstrap, 0))
+        self._boot_sum = np.zeros((n_bootstrap, 0))
+        self._reservoir = np.full((max_samples, 0), np.nan, dtype=np.float32)
+
+    def _grow(self, length: int):
+        extra = length - self._length
+        self._count = np.concatenate([self._count, np.zeros(extra)])
+        self._mean = np.concatenate([self._mean, np.zeros(extra)])
+        self._m2 = np.concatenate([self._m2, np.zeros(extra)])
+        self._boot_weight = np.pad(self._boot_weight, ((0, 0), (0, extra)))
+        self._boot_sum = np.pad(self._boot_sum, ((0, 0), (0, extra)))
+        self._reservoir = np.pad(self._reservoir, ((0, 0), (0, extra)), constant_values=np.nan)
+        self._length = length
+
+    def add(self, series: np.ndarray):
+        """Add one seed's per-episode series."""
+        x = np.asarray(series, dtype=np.float64)
+        n = len(x)
+        if n > self._length:
+            self._grow(n)
+
+        # Reservoir sampling per episode: the k-th value of a column replaces
+        # a random slot with probability max_samples / k
+        seen = self._count[:n].astype(np.int64)
+        slots = np.where(seen < self.max_samples, seen, self._rng.integers(0, seen + 1))
+        kept = slots < self.max_samples
+        self._reservoir[slots[kept], np.flatnonzero(kept)] = x[kept]
+
+        count = self._count[:n]
+        count += 1
+        delta = x - self._mean[:n]
+        self._mean[:n] += delta / count
+        self._m2[:n] += delta * (x - self._mean[:n])
+
+        weights = self._rng.poisson(1.0, size=(self.n_bootstrap, 1))
+        self._boot_weight[:, :n] += weights
+        self._boot_sum[:, :n] += weights * x
+        self.seeds += 1
+
+    def summary(self) -> AggregateSummary:
+        """Current per-episode statistics."""
+        if not self.seeds:
+            raise ValueError("No series added")
+        var = np.divide(self._m2, self._count - 1, out=np.zeros_like(self._m2),
+                        where=self._count > 1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            boot_means = self._boot_sum / self._boot_weight
+        alpha = 1.0 - self.confidence
+        ci_low, ci_high = _quantile(boot_means, [alpha / 2, 1 - alpha / 2])
+        levels = _quantile(self._reservoir[:min(self.seeds, self.max_samples)],
+                           self.quantile_levels)
+        return AggregateSummary(
+            n_seeds=self._count.astype(int), mean=self._mean.copy(), std=np.sqrt(var),
+            ci_low=ci_low, ci_high=ci_high,
+            quantiles=dict(zip(self.quantile_levels, levels)), confidence=self.confidence)
+
+def _quantile(values: np.ndarray, levels: Sequence[float]) -> np.ndarray:
+    """Column quantiles ignoring NaNs (``np.nanquantile`` is much slower, so only used if needed)."""
+    if np.isnan(values).any():
+        return np.nanquantile(values, levels, axis=0)
+    return np.quantile(values, levels, axis=0)
+
+def aggregate_results(entries: Iterable[Tuple[Dict[str, Any], Dict[str, List]]],
+                      group_by: Optional[Callable[[Dict[str, Any]], Any]] = None,
+                      window: int = 50, metrics: Sequence[str] = METRICS,
+                      **aggregator_kwargs) -> Dict[Any, Dict[str, AggregateSummary]]:
+    """Aggregate streamed ``(metadata, result)`` pairs into per-group summaries.
+
+    ``group_by`` maps a result's metadata to its group (e.g. agent type);
+    by default everything forms a single group ``None``.
+    """
+    aggregators: Dict[Any, Dict[str, SeedAggregator]] = {}
+    for meta, result in entries:
+        group = group_by(meta) if group_by else None
+        if group not in aggregators:
+            aggregators[group] = {m: SeedAggregator(**aggregator_kwargs) for m in metrics}
+        series = episode_series(result, window)
+        for metric in metrics:
+            aggregators[group][metric].add(series[metric])
+    return {group: {m: agg.summary() for m, agg in by_metric.items()}
+            for group, by_metric in aggregators.items()}
@@ -0,0 +1,180 @@
+"""Checkpoint and resume support for long training runs."""
+import glob
+import os
+import pickle
+import random
+import numpy as np
+import torch as th
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+CHECKPOINT_VERSION = 1
+
+def capture_rng_state() -> Dict[str, Any]:
+    """Snapshot torch, numpy and python RNG states."""
+    return {
+        'torch': th.get_rng_state(),
+        'numpy': np.random.get_state(),
+        'python': random.getstate()
+    }
+
+def restore_rng_state(state: Dict[str, Any]):
+    """Restore RNG states captured by ``capture_rng_state``."""
+    th.set_rng_state(state['torch'])
+    np.random.set_state(state['numpy'])
+    random.setstate(state['python'])
+
+RESULT_KEYS = ('rewards', 'actions', 'predictions', 'q_values')
+
+def _pack_series(key: str, values: List, actions: List[int]) -> np.ndarray:
+    """Store one per-episode result list as a compact array."""
+    if key == 'q_values':
+        return np.asarray([[q[a] for a in actions] for q in values],
+                          dtype=np.float64).reshape(len(values), len(actions))
+    return np.asarray(values, dtype=np.float64 if key == 'rewards' else np.int64)
+
+def _pack_results(results: Dict[str, List], actions: List[int]) -> Dict[str, np.ndarray]:
+    """Store per-episode result lists as compact arrays."""
+    return {key: _pack_series(key, results[key], actions) for key in RESULT_KEYS}
+
+def _unpack_results(packed: Dict[str, np.ndarray], actions: List[int]) -> Dict[str, List]:
+    return {
+        'rewards': packed['rewards'].tolist(),
+        'actions': packed['actions'].tolist(),
+        'predictions': packed['predictions'].tolist(),
+        'q_values': [dict(zip(actions, row)) for row in packed['q_values'].tolist()]
+    }
+
+def capture_state(agent, env, episode: int, results: Optional[Dict[str, List]] = None
+                  ) -> Dict[str, Any]:
+    """Snapshot agent, environment, RNG and partial results after ``episode`` episodes.
+
+    The returned dict shares no mutable state with the running objects, so it
+    can be serialized while training continues.
+    """
+    for obj in (agent, env):
+        if not hasattr(obj, 'state_dict'):
+            raise TypeError(f"{type(obj).__name__} does not support checkpointing")
+    results = results or {'rewards': [], 'actions': [], 'predictions': [], 'q_values': []}
+    return {
+        'version': CHECKPOINT_VERSION,
+        'episode': episode,
+        'agent': agent.state_dict(),
+        'env': env.state_dict(),
+        'rng': capture_rng_state(),
+        'actions': list(agent.actions),
+        'results': _pack_results(results, agent.actions)
+    }
+
+def restore_state(checkpoint: Dict[str, Any], agent, env) -> Dict[str, List]:
+    """Load a snapshot into ``agent`` and ``env`` and return its partial results."""
+    if checkpoint.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version: {checkpoint.get('version')}")
+    agent.load_state_dict(checkpoint['agent'])
+    env.load_state_dict({key: value.tolist() if isinstance(value, np.ndarray) else value
+                         for key, value in checkpoint['env'].items()})
+    restore_rng_state(checkpoint['rng'])
+    return _unpack_results(checkpoint['results'], checkpoint['actions'])
+
+def save_checkpoint(checkpoint: Dict[str, Any], filename: str):
+    """Atomically write a snapshot to ``filename``."""
+    tmp = f"{filename}.tmp"
+    with open(tmp, 'wb') as f:
+        pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, filename)
+
+def load_checkpoint(path: str) -> Dict[str, Any]:
+    """Load a snapshot from a file, or the latest one in a directory."""
+    if os.path.isdir(path):
+        latest = latest_checkpoint(path)
+        if latest is None:
+            raise FileNotFoundError(f"No checkpoints in {path}")
+        path = latest
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+def latest_checkpoint(directory: str) -> Optional[str]:
+    """Path of the checkpoint with the highest episode number, if any."""
+    paths = sorted(glob.glob(os.path.join(directory, 'checkpoint_*.pkl')))
+    return paths[-1] if paths else None
+
+class Checkpointer:
+    """Writes checkpoints every ``every`` episodes from a background thread.
+
+    The training loop only snapshots the small agent/environment state and
+    the lengths of the per-episode lists (results and the environment's
+    ``APPEND_ONLY_STATE``). Since those lists only grow, the single writer
+    thread packs just the entries added since the previous checkpoint onto
+    its cached arrays, then serializes and writes the file. The loop only
+    waits if the previous checkpoint is still being written.
+    """
+
+    def __init__(self, directory: str, every: int = 100, keep: int = 2):
+        self.directory = directory
+        self.every = every
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending: Optional[Future] = None
+        # Packed prefix of each append-only list: key -> (list object, array)
+        self._packed: Dict[str, Any] = {}
+
+    def path(self, episode: int) -> str:
+        return os.path.join(self.directory, f"checkpoint_{episode:012d}.pkl")
+
+    def due(self, episode: int) -> bool:
+        """Whether a checkpoint should be taken after ``episode`` episodes."""
+        return episode % self.every == 0
+
+    def save(self, agent, env, episode: int, results: Optional[Dict[str, List]] = None):
+        """Snapshot state now and write it asynchronously."""
+        for obj in (agent, env):
+            if not hasattr(obj, 'state_dict'):
+                raise TypeError(f"{type(obj).__name__} does not support checkpointing")
+        results = results or {key: [] for key in RESULT_KEYS}
+        history = getattr(env, 'APPEND_ONLY_STATE', ())
+        checkpoint = {
+            'version': CHECKPOINT_VERSION,
+            'episode': episode,
+            'agent': agent.state_dict(),
+            'env': env.state_dict(history=False) if history else env.state_dict(),
+            'rng': capture_rng_state(),
+            'actions': list(agent.actions)
+        }
+        # The lists keep growing while the writer runs; only their current length is fixed here
+        series = {key: (results[key], len(results[key])) for key in RESULT_KEYS}
+        series.update({f'env.{name}': (getattr(env, name), len(getattr(env, name))) for name in history})
+        self.wait()
+        self._pending = self._executor.submit(self._write, checkpoint, series, self.path(episode))
+
+    def _pack(self, key: str, values: List, length: int, actions: List[int]) -> np.ndarray:
+        """Packed ``values[:length]``, packing only entries not packed before."""
+        source, packed = self._packed.get(key, (None, None))
+        if source is not values or len(packed) > length:
+            packed = _pack_series(key, values[:length], actions)
+        elif len(packed) < length:
+            packed = np.concatenate([packed, _pack_series(key, values[len(packed):length], actions)])
+        self._packed[key] = (values, packed)
+        return packed
+
+    def _write(self, checkpoint: Dict[str, Any], series: Dict[str, Any], filename: str):
+        actions = checkpoint['actions']
+        packed = {key: self._pack(key, values, length, actions)
+                  for key, (values, length) in series.items()}
+        checkpoint['results'] = {key: packed[key] for key in RESULT_KEYS}
+        checkpoint['env'].update({key[len('env.'):]: array for key, array in packed.items()
+                                  if key.startswith('env.')})
+        save_checkpoint(checkpoint, filename)
+        paths = sorted(glob.glob(os.path.join(self.directory, 'checkpoint_*.pkl')))
+        for old in paths[:-self.keep]:
+            os.remove(old)
+
+    def wait(self):
+        """Block until the pending write (if any) has finished."""
+        if self._pending is not None:
+            self._pending.result()
+            self._pending = None
+
+    def close(self):
+        self.wait()
+        self._executor.shutdown()
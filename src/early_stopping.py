@@ -0,0 +1,75 @@
+"""Sequential convergence detection for early stopping of training runs."""
+import math
+from collections import deque
+from statistics import NormalDist
+from typing import Optional
+
+class ConvergenceMonitor:
+    """Online equivalence test on windowed one-box rate and mean reward.
+
+    Every ``check_every`` episodes the last ``window`` episodes are compared
+    with the ``window`` episodes before them. The run counts as converged when
+    a two one-sided test shows both the one-box rate difference and the mean
+    reward difference lie within their tolerances. The k-th test is run at
+    level ``(1 - confidence) / (k (k + 1))``, so the probability of ever
+    stopping on a non-converged run stays below ``1 - confidence`` however
+    long the run is.
+    """
+
+    def __init__(self, window: int = 200, confidence: float = 0.95,
+                 rate_tolerance: float = 0.1, reward_tolerance: float = 100000.0,
+                 min_episodes: int = 200, check_every: Optional[int] = None,
+                 one_box_action: int = 0):
+        if not 0 < confidence < 1:
+            raise ValueError("confidence must be in (0, 1)")
+        self.window = window
+        self.confidence = confidence
+        self.rate_tolerance = rate_tolerance
+        self.reward_tolerance = reward_tolerance
+        self.min_episodes = max(min_episodes, 2 * window)
+        self.check_every = check_every or window
+        self.one_box_action = one_box_action
+
+        self.episodes = 0
+        self.tests = 0
+        self.stopped_episode: Optional[int] = None
+        self._one_box = deque(maxlen=2 * window)
+        self._rewards = deque(maxlen=2 * window)
+
+    @property
+    def converged(self) -> bool:
+        return self.stopped_episode is not None
+
+    def update(self, action: int, reward: float) -> bool:
+        """Record one episode; return True once convergence is established."""
+        self.episodes += 1
+        self._one_box.append(1.0 if action == self.one_box_action else 0.0)
+        self._rewards.append(reward)
+
+        if self.converged:
+            return True
+        if self.episodes < self.min_episodes or self.episodes % self.check_every:
+            return False
+
+        self.tests += 1
+        alpha = (1.0 - self.confidence) / (self.tests * (self.tests + 1))
+        z = NormalDist().inv_cdf(1.0 - alpha)
+        if (self._equivalent(self._one_box, z, self.rate_tolerance)
+                and self._equivalent(self._rewards, z, self.reward_tolerance)):
+            self.stopped_episode = self.episodes
+            return True
+        return False
+
+    def _equivalent(self, values: deque, z: float, tolerance: float) -> bool:
+        """Whether the two halves of ``values`` have means within ``tolerance``."""
+        previous = list(values)[:self.window]
+        current = list(values)[self.window:]
+        mean_prev, var_prev = _mean_var(previous)
+        mean_cur, var_cur = _mean_var(current)
+        stderr = math.sqrt(var_prev / len(previous) + var_cur / len(current))
+        return abs(mean_cur - mean_prev) + z * stderr < tolerance
+
+def _mean_var(values: list) -> tuple:
+    mean = sum(values) / len(values)
+    var = sum((v - mean) ** 2 for v in values) / max(1, len(values) - 1)
+    return mean, var
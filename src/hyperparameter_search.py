@@ -0,0 +1,151 @@
+"""Successive-halving and Hyperband search over agent hyperparameters."""
+import itertools
+import math
+import torch as th
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from .checkpoint import capture_state
+from .utils import build_agent, build_env, run_experiment, calculate_convergence_metrics
+
+DEFAULT_SPACE = {
+    'uncertainty_radius': [0.05, 0.1, 0.2, 0.3, 0.5],
+    'learning_rate': [0.05, 0.1, 0.2],
+    'epsilon': [0.02, 0.05, 0.1],
+    'gamma': [0.8, 0.9, 0.95]
+}
+
+@dataclass
+class Trial:
+    """One configuration being trained across rungs."""
+    config: Dict[str, Any]
+    seed: int
+    episodes: int = 0
+    score: float = float('-inf')
+    metrics: Dict[str, float] = field(default_factory=dict)
+    rung_scores: Dict[int, float] = field(default_factory=dict)  # episodes -> score
+    state: Optional[Dict[str, Any]] = field(default=None, repr=False)
+
+@dataclass
+class SearchResult:
+    """Outcome of a hyperparameter search."""
+    best_config: Dict[str, Any]
+    best_score: float
+    trials: List[Trial]
+    total_episodes: int
+
+def sample_configs(space: Dict[str, List], n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Draw ``n`` distinct configurations from a grid (all of them if ``n`` covers it)."""
+    keys = list(space)
+    grid = list(itertools.product(*(space[k] for k in keys)))
+    if n < len(grid):
+        gen = th.Generator().manual_seed(seed)
+        grid = [grid[i] for i in th.randperm(len(grid), generator=gen)[:n].tolist()]
+    return [dict(zip(keys, values)) for values in grid]
+
+def _train_trial(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Continue one trial up to ``job['episodes']`` episodes (runs in a worker)."""
+    agent = build_agent(job['agent_type'], **job['config'])
+    env = build_env(job['env_type'], **job['env_kwargs'])
+    if job['state'] is None:
+        th.manual_seed(job['seed'])
+    results = run_experiment(agent, env, episodes=job['episodes'], verbose=False,
+                             resume_from=job['state'])
+    # Short rungs are scored on all their episodes rather than the usual last 100
+    metrics = calculate_convergence_metrics(results['actions'], results['rewards'],
+                                            window=min(100, len(results['actions'])))
+    return {
+        'score': float(metrics.get(job['metric'], float('-inf'))),
+        'metrics': metrics,
+        'state': capture_state(agent, env, job['episodes'], results)
+    }
+
+def _init_worker():
+    th.set_num_threads(1)
+
+def _run_rung(trials: List[Trial], episodes: int, agent_type: str, env_type: str,
+              env_kwargs: Dict[str, Any], metric: str, executor: Optional[ProcessPoolExecutor]):
+    jobs = [{
+        'agent_type': agent_type, 'env_type': env_type, 'env_kwargs': env_kwargs,
+        'config': trial.config, 'seed': trial.seed, 'episodes': episodes,
+        'state': trial.state, 'metric': metric
+    } for trial in trials]
+    outputs = executor.map(_train_trial, jobs) if executor else map(_train_trial, jobs)
+    for trial, output in zip(trials, outputs):
+        trial.episodes = episodes
+        trial.score = output['score']
+        trial.rung_scores[episodes] = output['score']
+        trial.metrics = output['metrics']
+        trial.state = output['state']
+
+def successive_halving(configs: List[Dict[str, Any]], min_episodes: int = 100,
+                       max_episodes: int = 900, eta: int = 3,
+                       agent_type: str = 'InfrabayesianRLAgent',
+                       env_type: str = 'NewcombEnvironment',
+                       env_kwargs: Optional[Dict[str, Any]] = None,
+                       metric: str = 'final_avg_reward', seed: int = 0,
+                       n_workers: Optional[int] = None, verbose: bool = True) -> SearchResult:
+    """Train all configs briefly, keep the best ``1/eta``, train those longer, repeat.
+
+    Surviving trials continue from their previous rung's state rather than
+    restarting, so a config promoted to the last rung costs ``max_episodes``
+    episodes in total. Each rung's trials run in a process pool of
+    ``n_workers`` processes (in-process when ``n_workers`` is 1).
+    """
+    env_kwargs = env_kwargs or {}
+    trials = [Trial(config=config, seed=seed + i) for i, config in enumerate(configs)]
+    survivors = list(trials)
+    episodes = min_episodes
+    total_episodes = 0
+
+    executor = None if n_workers == 1 else ProcessPoolExecutor(n_workers, initializer=_init_worker)
+    try:
+        while True:
+            total_episodes += sum(episodes - t.episodes for t in survivors)
+            _run_rung(survivors, episodes, agent_type, env_type, env_kwargs, metric, executor)
+            survivors.sort(key=lambda t: t.score, reverse=True)
+            if verbose:
+                print(f"Rung at {episodes} episodes: {len(survivors)} configs, "
+                      f"best {metric}={survivors[0].score:.3f} with {survivors[0].config}")
+            if episodes >= max_episodes:
+                break
+            survivors = survivors[:max(1, len(survivors) // eta)]
+            episodes = min(max_episodes, episodes * eta)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    for trial in trials:
+        trial.state = None
+    best = survivors[0]
+    return SearchResult(best_config=best.config, best_score=best.score,
+                        trials=trials, total_episodes=total_episodes)
+
+def hyperband(space: Dict[str, List] = DEFAULT_SPACE, min_episodes: int = 100,
+              max_episodes: int = 900, eta: int = 3, seed: int = 0,
+              verbose: bool = True, **kwargs) -> SearchResult:
+    """Hyperband: successive halving brackets trading config count against budget.
+
+    Remaining keyword arguments are passed to ``successive_halving``.
+    """
+    s_max = int(math.log(max_episodes / min_episodes, eta) + 1e-9)
+    best = None
+    trials: List[Trial] = []
+    total_episodes = 0
+
+    for s in reversed(range(s_max + 1)):
+        n = math.ceil((s_max + 1) / (s + 1) * eta ** s)
+        start = max(min_episodes, int(max_episodes / eta ** s))
+        if verbose:
+            print(f"Bracket s={s}: {n} configs starting at {start} episodes")
+        result = successive_halving(sample_configs(space, n, seed + s), min_episodes=start,
+                                    max_episodes=max_episodes, eta=eta, seed=seed + 1000 * s,
+                                    verbose=verbose, **kwargs)
+        trials.extend(result.trials)
+        total_episodes += result.total_episodes
+        # Only compare configs trained to the full budget across brackets
+        if best is None or result.best_score > best.best_score:
+            best = result
+
+    return SearchResult(best_config=best.best_config, best_score=best.best_score,
+                        trials=trials, total_episodes=total_episodes)
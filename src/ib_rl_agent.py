@@ -1,20 +1,42 @@
 import torch as th
 import torch.distributions as thd
-from typing import Dict, List, Tuple
+from typing import Any, Dict, List, Tuple, Union
 from collections import defaultdict
 from .infradistribution import InfraPolytope
 from .sa_measure import SaMeasure
+from .kernels import FusedBackup
+
+def _to_plain(table: Dict) -> Dict:
+    """Convert nested defaultdict table to plain (picklable) dicts."""
+    return {s: dict(row) for s, row in table.items()}
+
+def _from_plain(table: Dict, default) -> defaultdict:
+    """Rebuild nested defaultdict table from plain dicts."""
+    result = defaultdict(lambda: defaultdict(default))
+    for s, row in table.items():
+        result[s].update(row)
+    return result
+
+def _epsilon_greedy_probability(agent, state: int, action: int) -> float:
+    """Action probability under epsilon-greedy exploration around ``greedy_action``."""
+    explore = agent.epsilon / len(agent.actions)
+    greedy = 1.0 - agent.epsilon if action == agent.greedy_action(state) else 0.0
+    return explore + greedy
 
 class InfrabayesianRLAgent:
     """RL agent using infrabayesian epistemology."""
     
     def __init__(self, actions: List[int], uncertainty_radius: float = 0.1, 
-                 learning_rate: float = 0.1, epsilon: float = 0.05, gamma: float = 0.9):
+                 learning_rate: float = 0.1, epsilon: float = 0.05, gamma: float = 0.9,
+                 compiled: Union[bool, str] = False):
         self.actions = actions
         self.uncertainty_radius = uncertainty_radius
         self.learning_rate = learning_rate
         self.epsilon = epsilon
         self.gamma = gamma
+        # Fused backup kernel for update(); True selects the TorchScript backend
+        self.compiled = compiled
+        self._backup = FusedBackup('script' if compiled is True else compiled) if compiled else None
         
         # Q-values and visit counts
         self.q_values = defaultdict(lambda: defaultdict(float))
@@ -59,7 +81,10 @@ class InfrabayesianRLAgent:
         if th.rand(1).item() < self.epsilon:
             return th.randint(0, len(self.actions), (1,)).item()
         
-        # Compute infrabayesian Q-values
+        return self.greedy_action(state)
+    
+    def greedy_action(self, state: int) -> int:
+        """Action maximizing the infrabayesian (worst-case) Q-value."""
         best_action = self.actions[0]
         best_value = float('-inf')
         
@@ -73,22 +98,63 @@ class InfrabayesianRLAgent:
         
         return best_action
     
+    def action_probability(self, state: int, action: int) -> float:
+        """Probability that ``select_action`` picks ``action`` in ``state``."""
+        return _epsilon_greedy_probability(self, state, action)
+    
     def update(self, state: int, action: int, reward: float, next_state: int):
         """Update using infrabayesian Bellman equation."""
         self.visit_counts[state][action] += 1
         
-        # Compute target using infrabayesian value
-        next_value = self.infrabayesian_value(next_state)
-        target = reward + self.gamma * next_value
-        
-        # Update Q-value
-        current_q = self.q_values[state][action]
-        self.q_values[state][action] += self.learning_rate * (target - current_q)
+        if self._backup is not None:
+            target = self._fused_update(state, action, reward, next_state)
+        else:
+            # Compute target using infrabayesian value
+            next_value = self.infrabayesian_value(next_state)
+            target = reward + self.gamma * next_value
+            
+            # Update Q-value
+            current_q = self.q_values[state][action]
+            self.q_values[state][action] += self.learning_rate * (target - current_q)
         
         # Store for uncertainty estimation
         self.q_history[state][action].append(target)
         if len(self.q_history[state][action]) > 100:
             self.q_history[state][action] = self.q_history[state][action][-100:]
+    
+    def _fused_update(self, state: int, action: int, reward: float, next_state: int) -> float:
+        """Single-kernel version of the update; returns the TD target."""
+        if not self.actions:
+            next_q = th.zeros(1, 1)
+            next_visits = th.ones(1, 1)
+            radius = th.zeros(1)
+        else:
+            next_q = th.tensor([[self.q_values[next_state][a] for a in self.actions]])
+            next_visits = th.tensor([[float(self.visit_counts[next_state][a]) for a in self.actions]])
+            radius = th.tensor([self.uncertainty_radius])
+        new_q, target = self._backup(
+            th.tensor([self.q_values[state][action]], dtype=th.float64), next_q, next_visits,
+            th.tensor([reward], dtype=th.float64), radius,
+            th.tensor([self.learning_rate], dtype=th.float64),
+            th.tensor([self.gamma], dtype=th.float64))
+        self.q_values[state][action] = new_q.item()
+        return target.item()
+    
+    def state_dict(self) -> Dict[str, Any]:
+        """Snapshot of learned state (Q-values, visit counts, target history)."""
+        return {
+            'q_values': _to_plain(self.q_values),
+            'visit_counts': _to_plain(self.visit_counts),
+            'q_history': {s: {a: list(h) for a, h in hist.items()}
+                          for s, hist in self.q_history.items()}
+        }
+    
+    def load_state_dict(self, state: Dict[str, Any]):
+        """Restore learned state produced by ``state_dict``."""
+        self.q_values = _from_plain(state['q_values'], float)
+        self.visit_counts = _from_plain(state['visit_counts'], int)
+        self.q_history = _from_plain({s: {a: list(h) for a, h in hist.items()}
+                                      for s, hist in state['q_history'].items()}, list)
 
 class ClassicalRLAgent:
     """Standard Q-learning agent for comparison."""
@@ -106,12 +172,28 @@ class ClassicalRLAgent:
         if th.rand(1).item() < self.epsilon:
             return th.randint(0, len(self.actions), (1,)).item()
         
+        return self.greedy_action(state)
+    
+    def greedy_action(self, state: int) -> int:
+        """Action with the highest Q-value."""
         best_action = max(self.actions, key=lambda a: self.q_values[state][a])
         return best_action
     
+    def action_probability(self, state: int, action: int) -> float:
+        """Probability that ``select_action`` picks ``action`` in ``state``."""
+        return _epsilon_greedy_probability(self, state, action)
+    
     def update(self, state: int, action: int, reward: float, next_state: int):
         """Standard Q-learning update."""
         next_value = max(self.q_values[next_state][a] for a in self.actions) if self.actions else 0
         target = reward + self.gamma * next_value
         current_q = self.q_values[state][action]
         self.q_values[state][action] += self.learning_rate * (target - current_q)
+    
+    def state_dict(self) -> Dict[str, Any]:
+        """Snapshot of learned Q-values."""
+        return {'q_values': _to_plain(self.q_values)}
+    
+    def load_state_dict(self, state: Dict[str, Any]):
+        """Restore Q-values produced by ``state_dict``."""
+        self.q_values = _from_plain(state['q_values'], float)
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import Callable, Union
-from .sa_measure import SaMeasure
+from .sa_measure import SaMeasure, SaMeasureExpr
 import torch as th
 import torch.distributions as thd
 
@@ -18,12 +18,12 @@ class InfraDistribution(ABC):
 class InfraPolytope(InfraDistribution):
     """Infradistribution represented by polytope of sa-measures."""
     
-    def __init__(self, batched_measure: Union[thd.Distribution, SaMeasure]):
-        """Construct from batch of sa-measures."""
+    def __init__(self, batched_measure: Union[thd.Distribution, SaMeasure, SaMeasureExpr]):
+        """Construct from batch of sa-measures (or a batched sa-measure expression)."""
         if isinstance(batched_measure, thd.Distribution):
             batched_measure = SaMeasure(batched_measure)
         
-        if not batched_measure.mu.batch_shape:
+        if not batched_measure.batch_shape:
             raise ValueError("SaMeasure should have at least one batch dimension")
         
         self._batched_measure = batched_measure
@@ -36,5 +36,65 @@ class InfraPolytope(InfraDistribution):
         """Maximum entropy over sa-measures."""
         return self._batched_measure.entropy().max(dim=0).values
 
+    def condition(self, event: th.Tensor, off_event_utility: Union[float, th.Tensor] = 0.0,
+                  normalize: bool = True) -> "InfraPolytope":
+        """Infrabayesian update on an observed event, in place.
+
+        ``event`` is a 0/1 indicator L over the outcomes (last dimension: the
+        categories of a Categorical, or ``[0, 1]`` for a Bernoulli) and
+        ``off_event_utility`` the utility g credited to outcomes outside it.
+        Every sa-measure ``(mu, scale, bias)`` becomes
+        ``(mu | L, scale * mu(L), bias + scale * E_mu[(1 - L) g])``, so the
+        updated set evaluates f as the old one evaluates ``L f + (1 - L) g``.
+        With ``normalize`` the set is then rescaled so that its lower
+        expectations of 0 and 1 are 0 and 1.
+
+        The event broadcasts against the batch dimensions after the credal set
+        dimension 0, so a polytope of batch shape ``(K, N)`` tracks N belief
+        streams and conditions each on its own observation in one call.
+        Only discrete (Bernoulli / Categorical) measures are supported.
+        """
+        measure = self._batched_measure
+        if not isinstance(measure, SaMeasure):
+            raise NotImplementedError("Conditioning not implemented for sa-measure expressions")
+        mu = measure.mu
+        if isinstance(mu, thd.Categorical):
+            probs = mu.probs
+        elif isinstance(mu, thd.Bernoulli):
+            probs = th.stack([1 - mu.probs, mu.probs], dim=-1)
+        else:
+            raise NotImplementedError(f"Conditioning not implemented for {type(mu)}")
+
+        event = th.as_tensor(event, dtype=probs.dtype, device=probs.device)
+        if event.dim() >= probs.dim():
+            raise ValueError("Event must broadcast against the batch dimensions after the credal set")
+        g = th.as_tensor(off_event_utility, dtype=probs.dtype, device=probs.device)
+        scale = measure.scale if measure.scale is not None else 1.0
+        bias = measure.bias if measure.bias is not None else 0.0
+
+        on_event = probs * event
+        mass = on_event.sum(-1)
+        new_scale = scale * mass
+        new_bias = bias + scale * (probs * (1 - event) * g).sum(-1)
+        # Measures without mass on the event keep their (now irrelevant) distribution
+        new_probs = th.where(mass.unsqueeze(-1) > 0,
+                             on_event / mass.clamp(min=th.finfo(probs.dtype).tiny).unsqueeze(-1),
+                             probs)
+
+        if normalize:
+            low = new_bias.min(dim=0).values
+            norm = (new_scale + new_bias).min(dim=0).values - low
+            if (norm <= 0).any():
+                raise ValueError("Event has zero lower probability; cannot renormalize")
+            new_scale = new_scale / norm
+            new_bias = (new_bias - low) / norm
+
+        if isinstance(mu, thd.Bernoulli):
+            new_mu = thd.Bernoulli(probs=new_probs[..., 1], validate_args=False)
+        else:
+            new_mu = thd.Categorical(probs=new_probs, validate_args=False)
+        self._batched_measure = SaMeasure(new_mu, new_scale, new_bias)
+        return self
+
     def __repr__(self):
         return f"InfraPolytope({self._batched_measure})"
@@ -5,6 +5,7 @@ import torch as th
 import torch.distributions as thd
 from functools import lru_cache
 from typing import Callable
+from .profiling import record_call
 
 @lru_cache()
 def gauss_hermite_params(n: int, device: th.device) -> tuple[th.Tensor, th.Tensor]:
@@ -17,6 +18,7 @@ def gauss_hermite_quadrature(
     mu: thd.Normal, f: Callable[[th.Tensor], th.Tensor], n: int = 20
 ) -> th.Tensor:
     """Compute expectation using Gauss-Hermite quadrature."""
+    record_call('gauss_hermite_quadrature')
     sig_sq = mu.variance
     locs, weights = gauss_hermite_params(n, sig_sq.device)
     padded_locs = locs.view(*locs.shape, *([1] * sig_sq.dim()))
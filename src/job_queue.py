@@ -0,0 +1,259 @@
+"""Broker-free experiment job queue on a shared directory.
+
+Jobs are JSON files that move between subdirectories of the queue root:
+
+    pending/  ->  running/  ->  done/      (results/<id>.pkl written first)
+                          \\->  failed/     (after max_attempts)
+
+Moves use ``os.rename``, which is atomic on a single filesystem, so exactly
+one worker wins each claim. A running job's lease is the mtime of its file;
+workers refresh it with a heartbeat and any process may return jobs whose
+lease expired to ``pending/``. Execution is at-least-once: a job whose worker
+stalls past its lease can run twice, but its result file is only replaced
+atomically.
+
+Start workers on any node that sees the directory:
+
+    python -m src.job_queue worker /shared/sweep
+    python -m src.job_queue status /shared/sweep
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import socket
+import threading
+import time
+import traceback
+import uuid
+import torch as th
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from .utils import build_agent, build_env, run_experiment
+
+STATES = ('pending', 'running', 'done', 'failed', 'results')
+
+def job_id(job: Dict[str, Any]) -> str:
+    """Stable id of a job spec, so resubmitting the same job is a no-op."""
+    spec = {k: v for k, v in job.items() if k not in ('id', 'attempts', 'errors')}
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+def _write_atomic(filename: str, data: bytes):
+    tmp = f"{filename}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, filename)
+
+def _read_job(filename: str) -> Dict[str, Any]:
+    with open(filename) as f:
+        return json.load(f)
+
+class JobQueue:
+    """Job queue stored in ``root`` on a filesystem shared by all workers."""
+
+    def __init__(self, root: str, lease_seconds: float = 300.0, max_attempts: int = 3):
+        self.root = root
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        for state in STATES:
+            os.makedirs(os.path.join(root, state), exist_ok=True)
+
+    def _path(self, state: str, jid: str) -> str:
+        suffix = '.pkl' if state == 'results' else '.json'
+        return os.path.join(self.root, state, jid + suffix)
+
+    def _ids(self, state: str) -> List[str]:
+        return sorted(name[:-5] for name in os.listdir(os.path.join(self.root, state))
+                      if name.endswith('.json'))
+
+    def submit(self, job: Dict[str, Any]) -> str:
+        """Add a job unless an identical one is already queued or finished."""
+        jid = job_id(job)
+        if not any(os.path.exists(self._path(state, jid)) for state in STATES):
+            job = {**job, 'id': jid, 'attempts': 0}
+            _write_atomic(self._path('pending', jid), json.dumps(job).encode())
+        return jid
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically move one pending job to running and return it."""
+        for jid in self._ids('pending'):
+            pending = self._path('pending', jid)
+            try:
+                # Refresh the lease before it becomes visible in running/
+                os.utime(pending)
+                os.rename(pending, self._path('running', jid))
+            except FileNotFoundError:
+                continue  # another worker got there first
+            job = _read_job(self._path('running', jid))
+            if os.path.exists(self._path('results', jid)):
+                # Finished by a worker whose lease had expired
+                self._finish(jid)
+                continue
+            return job
+        return None
+
+    def heartbeat(self, jid: str) -> bool:
+        """Extend the lease of a running job; False if it was taken away."""
+        try:
+            os.utime(self._path('running', jid))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def complete(self, jid: str, job: Dict[str, Any], result: Dict[str, Any]):
+        """Store a job's result and mark it done."""
+        _write_atomic(self._path('results', jid),
+                      pickle.dumps({'job': job, 'result': result},
+                                   protocol=pickle.HIGHEST_PROTOCOL))
+        self._finish(jid)
+
+    def _finish(self, jid: str):
+        try:
+            os.rename(self._path('running', jid), self._path('done', jid))
+        except FileNotFoundError:
+            pass  # lease expired and the job was requeued; the result stands
+
+    def fail(self, jid: str, error: str):
+        """Record a failed attempt and retry or give up on the job."""
+        running = self._path('running', jid)
+        try:
+            job = _read_job(running)
+        except FileNotFoundError:
+            return
+        self._retry(job, running, error)
+
+    def _retry(self, job: Dict[str, Any], current: str, error: str):
+        job['attempts'] += 1
+        job.setdefault('errors', []).append(error)
+        state = 'failed' if job['attempts'] >= self.max_attempts else 'pending'
+        _write_atomic(self._path(state, job['id']), json.dumps(job).encode())
+        try:
+            os.remove(current)
+        except FileNotFoundError:
+            pass
+
+    def requeue_expired(self) -> List[str]:
+        """Return running jobs whose lease has expired to pending (or failed).
+
+        An expired job is first renamed to a unique ``.expired`` file so only
+        one process requeues it. If that process dies before the job is back
+        in pending/, the leftover ``.expired`` file is requeued once it is
+        itself ``lease_seconds`` old.
+        """
+        requeued = []
+        now = time.time()
+        directory = os.path.join(self.root, 'running')
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(('.json', '.expired')):
+                continue
+            path = os.path.join(directory, name)
+            jid = name.split('.')[0]
+            try:
+                if now - os.stat(path).st_mtime < self.lease_seconds:
+                    continue
+                # Take the expired job out of running/ so only one process requeues it
+                expired = f"{self._path('running', jid)}.{uuid.uuid4().hex}.expired"
+                os.rename(path, expired)
+                os.utime(expired)
+                job = _read_job(expired)
+            except FileNotFoundError:
+                continue
+            self._retry(job, expired, 'lease expired')
+            requeued.append(jid)
+        return requeued
+
+    def status(self) -> Dict[str, int]:
+        """Number of jobs in each state."""
+        return {state: len(self._ids(state)) for state in STATES if state != 'results'}
+
+    def results(self) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Iterate over ``(job, result)`` pairs of finished jobs, one file at a time."""
+        directory = os.path.join(self.root, 'results')
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.pkl'):
+                with open(os.path.join(directory, name), 'rb') as f:
+                    entry = pickle.load(f)
+                yield entry['job'], entry['result']
+
+def make_job(agent_type: str, env_type: str, seed: int, episodes: int = 1000,
+             agent_kwargs: Optional[Dict[str, Any]] = None,
+             env_kwargs: Optional[Dict[str, Any]] = None, **extra) -> Dict[str, Any]:
+    """Job spec for one ``run_experiment`` call."""
+    return {
+        'agent_type': agent_type, 'agent_kwargs': agent_kwargs or {},
+        'env_type': env_type, 'env_kwargs': env_kwargs or {},
+        'episodes': episodes, 'seed': seed, **extra
+    }
+
+def run_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute a job spec and return its ``run_experiment`` results."""
+    th.manual_seed(job['seed'])
+    agent = build_agent(job['agent_type'], **job['agent_kwargs'])
+    env = build_env(job['env_type'], **job['env_kwargs'])
+    return run_experiment(agent, env, episodes=job['episodes'], verbose=False)
+
+def _heartbeat_loop(queue: JobQueue, jid: str, stop: threading.Event):
+    while not stop.wait(queue.lease_seconds / 3):
+        if not queue.heartbeat(jid):
+            return
+
+def run_worker(root: str, lease_seconds: float = 300.0, max_attempts: int = 3,
+               poll_interval: float = 1.0, max_jobs: Optional[int] = None,
+               exit_when_idle: bool = True, verbose: bool = True) -> int:
+    """Claim and run jobs until the queue is drained; returns jobs completed."""
+    queue = JobQueue(root, lease_seconds, max_attempts)
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    completed = 0
+
+    while max_jobs is None or completed < max_jobs:
+        queue.requeue_expired()
+        job = queue.claim()
+        if job is None:
+            if exit_when_idle and not queue.status()['running']:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        stop = threading.Event()
+        beat = threading.Thread(target=_heartbeat_loop, args=(queue, job['id'], stop), daemon=True)
+        beat.start()
+        try:
+            result = run_job(job)
+        except Exception:
+            queue.fail(job['id'], f"{worker}: {traceback.format_exc()}")
+            if verbose:
+                print(f"[{worker}] job {job['id']} failed")
+            continue
+        finally:
+            stop.set()
+            beat.join()
+        queue.complete(job['id'], job, result)
+        completed += 1
+        if verbose:
+            print(f"[{worker}] job {job['id']} done")
+
+    return completed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shared-directory experiment job queue")
+    sub = parser.add_subparsers(dest='command', required=True)
+    work = sub.add_parser('worker', help='run jobs from the queue')
+    work.add_argument('root')
+    work.add_argument('--lease', type=float, default=300.0, help='lease length in seconds')
+    work.add_argument('--max-attempts', type=int, default=3)
+    work.add_argument('--poll', type=float, default=1.0, help='seconds between polls')
+    work.add_argument('--max-jobs', type=int)
+    work.add_argument('--wait', action='store_true', help='keep polling when the queue is empty')
+    status = sub.add_parser('status', help='show job counts')
+    status.add_argument('root')
+    args = parser.parse_args(argv)
+
+    if args.command == 'worker':
+        run_worker(args.root, args.lease, args.max_attempts, args.poll, args.max_jobs,
+                   exit_when_idle=not args.wait)
+    else:
+        for state, count in JobQueue(args.root).status().items():
+            print(f"{state:<8}{count:>6}")
+
+if __name__ == "__main__":
+    main()
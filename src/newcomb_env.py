@@ -1,10 +1,13 @@
 import torch as th
-from typing import Tuple, Dict, List
+from typing import Any, Tuple, Dict, List
 from collections import defaultdict
 
 class NewcombEnvironment:
     """Newcomb's paradox as policy-dependent RL environment."""
     
+    # Lists that only ever grow; checkpoints copy just their new entries
+    APPEND_ONLY_STATE = ('agent_history', 'prediction_history')
+    
     def __init__(self, predictor_accuracy: float = 0.9):
         self.predictor_accuracy = predictor_accuracy
         self.state = 0
@@ -67,6 +70,29 @@ class NewcombEnvironment:
                 correct += 1
         
         return correct / (len(self.agent_history) - 1)
+    
+    def state_dict(self, history: bool = True) -> Dict[str, Any]:
+        """Snapshot of environment and predictor state.
+
+        With ``history=False`` the ``APPEND_ONLY_STATE`` lists are left out.
+        """
+        state = {
+            'state': self.state,
+            'predictor_accuracy': self.predictor_accuracy,
+            'episode_count': self.episode_count
+        }
+        if history:
+            for name in self.APPEND_ONLY_STATE:
+                state[name] = list(getattr(self, name))
+        return state
+    
+    def load_state_dict(self, state: Dict[str, Any]):
+        """Restore state produced by ``state_dict``."""
+        self.state = state['state']
+        self.predictor_accuracy = state['predictor_accuracy']
+        self.agent_history = list(state['agent_history'])
+        self.prediction_history = list(state['prediction_history'])
+        self.episode_count = state['episode_count']
 
 class LogicalPredictorEnv(NewcombEnvironment):
     """Enhanced predictor analyzing agent's decision algorithm."""
@@ -98,6 +124,17 @@ class LogicalPredictorEnv(NewcombEnvironment):
         
         # Fall back to base predictor
         return super().predict_agent_policy()
+    
+    def state_dict(self, history: bool = True) -> Dict[str, Any]:
+        state = super().state_dict(history)
+        state['consistency_tracker'] = dict(self.consistency_tracker)
+        state['pattern_memory'] = list(self.pattern_memory)
+        return state
+    
+    def load_state_dict(self, state: Dict[str, Any]):
+        super().load_state_dict(state)
+        self.consistency_tracker = defaultdict(int, state['consistency_tracker'])
+        self.pattern_memory = list(state['pattern_memory'])
 
 class MultiPredictorEnv(NewcombEnvironment):
     """Environment with multiple predictors of varying accuracy."""
@@ -114,3 +151,12 @@ class MultiPredictorEnv(NewcombEnvironment):
             self.predictor_accuracy = self.predictors[self.current_predictor]
         
         return super().reset()
+    
+    def state_dict(self, history: bool = True) -> Dict[str, Any]:
+        state = super().state_dict(history)
+        state['current_predictor'] = self.current_predictor
+        return state
+    
+    def load_state_dict(self, state: Dict[str, Any]):
+        super().load_state_dict(state)
+        self.current_predictor = state['current_predictor']
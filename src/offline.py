@@ -0,0 +1,221 @@
+"""Trajectory logging and offline batch evaluation of agent configurations."""
+import numpy as np
+import torch as th
+import torch.distributions as thd
+from typing import Any, Dict, Iterator, List, Optional
+from .infradistribution import InfraPolytope
+from .kernels import FusedBackup
+
+# One logged transition; files are raw arrays of these records
+TRANSITION_DTYPE = np.dtype([
+    ('state', '<i4'),
+    ('action', '<i4'),
+    ('reward', '<f8'),
+    ('next_state', '<i4'),
+    ('done', 'u1'),
+    ('behaviour_prob', '<f4')
+])
+
+class TrajectoryWriter:
+    """Appends transitions to a binary log in buffered blocks."""
+
+    def __init__(self, filename: str, buffer_size: int = 4096):
+        self._file = open(filename, 'wb')
+        self._buffer = np.zeros(buffer_size, dtype=TRANSITION_DTYPE)
+        self._size = 0
+
+    def append(self, state: int, action: int, reward: float, next_state: int,
+               done: bool, behaviour_prob: float):
+        self._buffer[self._size] = (state, action, reward, next_state, done, behaviour_prob)
+        self._size += 1
+        if self._size == len(self._buffer):
+            self.flush()
+
+    def flush(self):
+        self._buffer[:self._size].tofile(self._file)
+        self._size = 0
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+def load_trajectories(filename: str) -> np.memmap:
+    """Memory-map a trajectory log without reading it into memory."""
+    return np.memmap(filename, dtype=TRANSITION_DTYPE, mode='r')
+
+def log_trajectories(agent, env, episodes: int, filename: str):
+    """Run ``agent`` online for ``episodes`` episodes and log every transition.
+
+    The agent must provide ``action_probability`` so that the behaviour
+    policy's probability of each logged action can be stored.
+    """
+    with TrajectoryWriter(filename) as writer:
+        for _ in range(episodes):
+            state = env.reset()
+            done = False
+            while not done:
+                action = agent.select_action(state)
+                prob = agent.action_probability(state, action)
+                next_state, reward, done, _ = env.step(action)
+                agent.update(state, action, reward, next_state)
+                writer.append(state, action, reward, next_state, done, prob)
+                state = next_state
+
+def iter_chunks(transitions: np.ndarray, chunk_size: int = 65536) -> Iterator[np.ndarray]:
+    """Yield in-memory chunks of a (memory-mapped) log that end on episode boundaries."""
+    start = 0
+    n = len(transitions)
+    while start < n:
+        stop = min(n, start + chunk_size)
+        chunk = np.asarray(transitions[start:stop])
+        if stop < n:
+            ends = np.flatnonzero(chunk['done'])
+            if len(ends):
+                stop = start + ends[-1] + 1
+                chunk = chunk[:ends[-1] + 1]
+            else:
+                # Single episode longer than a chunk: extend to its end
+                while stop < n:
+                    ends = np.flatnonzero(transitions['done'][stop:stop + chunk_size])
+                    if len(ends):
+                        stop += ends[0] + 1
+                        break
+                    stop = min(n, stop + chunk_size)
+                chunk = np.asarray(transitions[start:stop])
+        yield chunk
+        start = stop
+
+class BatchedReplayLearner:
+    """Many infrabayesian Q-learning configurations replaying one log at once.
+
+    Each configuration is a dict of ``InfrabayesianRLAgent`` hyperparameters
+    (``uncertainty_radius``, ``learning_rate``, ``gamma``, ``epsilon``). Every
+    logged transition applies the agent's update rule to all configurations
+    with one call of the fused backup kernel (compiled with ``backend``). A
+    radius of 0 gives classical Q-learning.
+    """
+
+    DEFAULTS = {'uncertainty_radius': 0.1, 'learning_rate': 0.1, 'epsilon': 0.05, 'gamma': 0.9}
+
+    def __init__(self, configs: List[Dict[str, float]], num_states: int, num_actions: int,
+                 backend: str = 'script'):
+        self.configs = [{**self.DEFAULTS, **config} for config in configs]
+        self.num_states = num_states
+        self.num_actions = num_actions
+
+        def param(name):
+            return th.tensor([c[name] for c in self.configs], dtype=th.float64)
+        self.radius = param('uncertainty_radius')
+        self.learning_rate = param('learning_rate')
+        self.epsilon = param('epsilon')
+        self.gamma = param('gamma')
+
+        shape = (len(self.configs), num_states, num_actions)
+        self.q_values = th.zeros(shape, dtype=th.float64)
+        self.visit_counts = th.zeros(shape, dtype=th.float64)
+        self._backup = FusedBackup(backend)
+
+    def lower_q_values(self, q: th.Tensor, visits: th.Tensor) -> th.Tensor:
+        """Worst-case expected Q-values over each credal set, same shape as ``q``."""
+        radius = self.radius.view(-1, *([1] * (q.dim() - 1))) / visits.clamp(min=1).sqrt()
+        estimates = th.stack([q - radius, q, q + radius])
+        credal_set = InfraPolytope(thd.Normal(estimates, th.full_like(estimates, 0.01)))
+        return credal_set(lambda x: x)
+
+    def lower_values(self, state: int) -> th.Tensor:
+        """Infrabayesian value of ``state`` for every configuration, shape ``(C,)``."""
+        lower_q = self.lower_q_values(self.q_values[:, state], self.visit_counts[:, state])
+        return lower_q.max(dim=-1).values
+
+    def update(self, state: int, action: int, reward: float, next_state: int):
+        """Apply one logged transition to all configurations."""
+        self.visit_counts[:, state, action] += 1
+        self.q_values[:, state, action], _ = self._backup(
+            self.q_values[:, state, action], self.q_values[:, next_state],
+            self.visit_counts[:, next_state], th.full_like(self.gamma, reward),
+            self.radius, self.learning_rate, self.gamma)
+
+    def replay(self, transitions: np.ndarray, chunk_size: int = 65536):
+        """Replay a whole (memory-mapped) log in order."""
+        for chunk in iter_chunks(transitions, chunk_size):
+            for state, action, reward, next_state in zip(
+                    chunk['state'].tolist(), chunk['action'].tolist(),
+                    chunk['reward'].tolist(), chunk['next_state'].tolist()):
+                self.update(state, action, reward, next_state)
+
+    def policy_probs(self) -> th.Tensor:
+        """Epsilon-greedy action probabilities, shape ``(C, S, A)``."""
+        lower_q = self.lower_q_values(self.q_values, self.visit_counts)
+        greedy = th.nn.functional.one_hot(lower_q.argmax(dim=-1), self.num_actions).double()
+        eps = self.epsilon[:, None, None]
+        return eps / self.num_actions + (1 - eps) * greedy
+
+    def q_table(self, index: int) -> Dict[int, Dict[int, float]]:
+        """Q-values of one configuration in the agents' ``q_values`` layout."""
+        return {s: dict(enumerate(row)) for s, row in enumerate(self.q_values[index].tolist())}
+
+def off_policy_value(transitions: np.ndarray, target_probs: th.Tensor, gamma: th.Tensor,
+                     chunk_size: int = 65536) -> th.Tensor:
+    """Weighted importance-sampling estimate of each target policy's episode return.
+
+    ``target_probs`` has shape ``(C, S, A)`` and ``gamma`` shape ``(C,)``. In
+    policy-dependent environments such as Newcomb's problem the rewards
+    themselves depend on the policy, so these estimates only hold for
+    policies close to the logging policy.
+    """
+    target_probs = target_probs.double()
+    gamma = gamma.double()
+    weighted_returns = th.zeros(len(gamma), dtype=th.float64)
+    total_weight = th.zeros(len(gamma), dtype=th.float64)
+
+    for chunk in iter_chunks(transitions, chunk_size):
+        done = chunk['done'].astype(bool)
+        starts = np.concatenate([[0], np.flatnonzero(done[:-1]) + 1])
+        episode = np.cumsum(np.concatenate([[0], done[:-1]]))
+        step = th.as_tensor(np.arange(len(chunk)) - starts[episode], dtype=th.float64)
+
+        states = th.as_tensor(chunk['state'].astype(np.int64))
+        actions = th.as_tensor(chunk['action'].astype(np.int64))
+        behaviour = th.as_tensor(chunk['behaviour_prob'].astype(np.float64))
+        rewards = th.as_tensor(chunk['reward'].astype(np.float64))
+
+        log_ratio = (target_probs[:, states, actions] / behaviour).log()
+        discounted = gamma[:, None] ** step * rewards
+
+        index = th.as_tensor(episode).expand(len(gamma), -1)
+        n_episodes = len(starts)
+        log_weight = th.zeros(len(gamma), n_episodes, dtype=th.float64).scatter_add_(1, index, log_ratio)
+        returns = th.zeros(len(gamma), n_episodes, dtype=th.float64).scatter_add_(1, index, discounted)
+
+        weight = log_weight.exp()
+        weighted_returns += (weight * returns).sum(dim=1)
+        total_weight += weight.sum(dim=1)
+
+    return weighted_returns / total_weight
+
+def evaluate_configs(filename: str, configs: List[Dict[str, float]],
+                     num_states: Optional[int] = None, num_actions: Optional[int] = None,
+                     chunk_size: int = 65536) -> Dict[str, Any]:
+    """Replay a logged trajectory file through many configurations at once.
+
+    Returns the learner (with per-configuration Q-tables) and each
+    configuration's off-policy value estimate.
+    """
+    transitions = load_trajectories(filename)
+    if num_states is None:
+        num_states = 1 + max(int(chunk[key].max()) for chunk in iter_chunks(transitions, chunk_size)
+                             for key in ('state', 'next_state'))
+    if num_actions is None:
+        num_actions = 1 + max(int(chunk['action'].max()) for chunk in iter_chunks(transitions, chunk_size))
+
+    learner = BatchedReplayLearner(configs, num_states, num_actions)
+    learner.replay(transitions, chunk_size)
+    values = off_policy_value(transitions, learner.policy_probs(), learner.gamma, chunk_size)
+    return {'learner': learner, 'values': values, 'configs': learner.configs}
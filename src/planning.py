@@ -0,0 +1,102 @@
+"""Infra-Bellman value iteration for known tabular environments."""
+import torch as th
+import torch.distributions as thd
+from dataclasses import dataclass
+from typing import Dict, Optional
+from .infradistribution import InfraPolytope
+
+@dataclass
+class PlanningResult:
+    """Solution of infrabayesian value iteration."""
+    values: th.Tensor
+    q_values: th.Tensor
+    policy: th.Tensor
+    iterations: int
+    converged: bool
+    residual: float
+
+    def q_table(self) -> Dict[int, Dict[int, float]]:
+        """Q-values in the agents' ``q_values[state][action]`` layout."""
+        return {s: {a: q for a, q in enumerate(row)} for s, row in enumerate(self.q_values.tolist())}
+
+class InfraValueIteration:
+    """Vectorized lower-expectation value iteration.
+
+    The transition model is an ``InfraPolytope`` of categorical next-state
+    distributions with batch shape ``(K, S, A)``: for every state-action pair
+    the credal set is spanned by ``K`` extreme points. Each backup computes
+
+        Q(s, a) = R(s, a) + gamma * min_k E_{P_k(.|s, a)}[V]
+        V(s) = max_a Q(s, a)
+
+    for all states at once.
+    """
+
+    def __init__(self, transitions: InfraPolytope, rewards: th.Tensor, gamma: float = 0.9):
+        mu = transitions._batched_measure.mu
+        if not isinstance(mu, thd.Categorical):
+            raise TypeError("Transition model must be a polytope of Categorical distributions")
+        if mu.batch_shape[1:] != rewards.shape or mu.param_shape[-1] != rewards.shape[0]:
+            raise ValueError(f"Transition batch shape {tuple(mu.batch_shape)} with "
+                             f"{mu.param_shape[-1]} next states does not match rewards "
+                             f"of shape {tuple(rewards.shape)}")
+        if not 0 <= gamma < 1:
+            raise ValueError("gamma must be in [0, 1)")
+
+        self.transitions = transitions
+        self.rewards = rewards
+        self.gamma = gamma
+
+    @classmethod
+    def from_probs(cls, probs: th.Tensor, rewards: th.Tensor, gamma: float = 0.9
+                   ) -> "InfraValueIteration":
+        """Build from a ``(K, S, A, S)`` tensor of extreme-point transition probabilities."""
+        return cls(InfraPolytope(thd.Categorical(probs=probs)), rewards, gamma)
+
+    @property
+    def num_states(self) -> int:
+        return self.rewards.shape[0]
+
+    def bellman_backup(self, values: th.Tensor) -> th.Tensor:
+        """Q-values of one infra-Bellman backup of state values."""
+        lower_expectation = self.transitions(lambda next_state: values[next_state])
+        return self.rewards + self.gamma * lower_expectation
+
+    def solve(self, tol: float = 1e-6, max_iterations: int = 10000,
+              initial_values: Optional[th.Tensor] = None,
+              policy_patience: Optional[int] = None) -> PlanningResult:
+        """Iterate backups until the sup-norm change drops below ``tol``.
+
+        If ``policy_patience`` is set, also stop once the greedy policy has
+        been unchanged for that many consecutive iterations.
+        """
+        if initial_values is None:
+            values = th.zeros(self.num_states, dtype=self.rewards.dtype)
+        else:
+            values = initial_values.to(self.rewards.dtype)
+
+        policy = None
+        stable = 0
+        residual = float('inf')
+        converged = False
+        iteration = 0
+
+        for iteration in range(1, max_iterations + 1):
+            q_values = self.bellman_backup(values)
+            new_values, new_policy = q_values.max(dim=-1)
+            residual = (new_values - values).abs().max().item()
+            values = new_values
+
+            if residual < tol:
+                converged = True
+                break
+
+            if policy_patience is not None:
+                stable = stable + 1 if policy is not None and th.equal(new_policy, policy) else 0
+                if stable >= policy_patience:
+                    break
+            policy = new_policy
+
+        q_values = self.bellman_backup(values)
+        return PlanningResult(values=values, q_values=q_values, policy=q_values.argmax(dim=-1),
+                              iterations=iteration, converged=converged, residual=residual)
@@ -0,0 +1,197 @@
+"""Opt-in instrumentation for the experiment hot loop."""
+import cProfile
+import io
+import json
+import math
+import pstats
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+# Profiler currently collecting call counts, if any
+_active: Optional["Profiler"] = None
+
+def record_call(name: str):
+    """Count one invocation of an instrumented routine (no-op when disabled)."""
+    if _active is not None:
+        _active.calls[name] += 1
+
+class _NullPhase:
+    """Context manager that does nothing."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_PHASE = _NullPhase()
+
+class _PhaseTimer:
+    """Reusable wall-clock timer for one named phase."""
+    __slots__ = ('_profiler', '_name', '_start')
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self._profiler = profiler
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._profiler.record(self._name, time.perf_counter() - self._start)
+        return False
+
+class PhaseStats:
+    """Call count, total time and log2-bucketed histogram of a phase."""
+    __slots__ = ('count', 'total', 'min', 'max', 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        # Bucket k holds durations in [2^k, 2^(k+1)) microseconds
+        self.histogram: Dict[int, int] = defaultdict(int)
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        micros = seconds * 1e6
+        bucket = math.frexp(micros)[1] - 1 if micros >= 1.0 else 0
+        self.histogram[bucket] += 1
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'total_s': self.total,
+            'mean_s': self.mean,
+            'min_s': self.min if self.count else 0.0,
+            'max_s': self.max,
+            'histogram_us': {f'{2 ** k}-{2 ** (k + 1)}': n
+                             for k, n in sorted(self.histogram.items())}
+        }
+
+class Profiler:
+    """Collects per-phase timings and call counts of instrumented routines.
+
+    Use as a context manager to enable call counting, and wrap code regions
+    with ``profiler.phase(name)`` to time them.
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, PhaseStats] = defaultdict(PhaseStats)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self._timers: Dict[str, _PhaseTimer] = {}
+        self._previous: Optional[Profiler] = None
+
+    def __enter__(self):
+        global _active
+        self._previous = _active
+        _active = self
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        _active = self._previous
+        self._previous = None
+        return False
+
+    def phase(self, name: str) -> _PhaseTimer:
+        """Context manager timing one execution of the named phase."""
+        timer = self._timers.get(name)
+        if timer is None:
+            timer = self._timers[name] = _PhaseTimer(self, name)
+        return timer
+
+    def record(self, name: str, seconds: float):
+        self.phases[name].add(seconds)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Machine-readable view of all collected statistics."""
+        return {
+            'phases': {name: stats.to_dict() for name, stats in self.phases.items()},
+            'calls': dict(self.calls)
+        }
+
+    def dump(self, filename: str):
+        """Write statistics as JSON."""
+        with open(filename, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def summary(self) -> str:
+        """Human-readable table of phase timings and call counts."""
+        total = sum(stats.total for stats in self.phases.values()) or 1.0
+        lines = [f"{'phase':<16}{'count':>10}{'total(s)':>12}{'mean(us)':>12}"
+                 f"{'max(us)':>12}{'share':>8}"]
+        for name, stats in sorted(self.phases.items(), key=lambda kv: -kv[1].total):
+            lines.append(f"{name:<16}{stats.count:>10}{stats.total:>12.4f}"
+                         f"{stats.mean * 1e6:>12.1f}{stats.max * 1e6:>12.1f}"
+                         f"{stats.total / total:>8.1%}")
+        if self.calls:
+            lines.append('')
+            lines.append(f"{'routine':<28}{'calls':>10}")
+            for name, count in sorted(self.calls.items()):
+                lines.append(f"{name:<28}{count:>10}")
+        return '\n'.join(lines)
+
+class _NullProfiler(Profiler):
+    """Profiler that records nothing, used when instrumentation is off."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def phase(self, name: str) -> _NullPhase:
+        return _NULL_PHASE
+
+    def record(self, name: str, seconds: float):
+        pass
+
+NULL_PROFILER = _NullProfiler()
+
+@contextmanager
+def profile_region(kind: str = 'cprofile', output: Optional[str] = None,
+                   sort_by: str = 'cumulative', limit: int = 30) -> Iterator[Any]:
+    """Run a region under cProfile or torch.profiler.
+
+    Yields the underlying profiler object. If ``output`` is given the report
+    (pstats text, or a Chrome trace for torch) is written there, otherwise the
+    top ``limit`` entries are printed.
+    """
+    if kind == 'cprofile':
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield prof
+        finally:
+            prof.disable()
+            stream = io.StringIO()
+            pstats.Stats(prof, stream=stream).sort_stats(sort_by).print_stats(limit)
+            if output:
+                with open(output, 'w') as f:
+                    f.write(stream.getvalue())
+            else:
+                print(stream.getvalue())
+    elif kind == 'torch':
+        import torch.profiler as thp
+        with thp.profile(activities=[thp.ProfilerActivity.CPU], record_shapes=True) as prof:
+            yield prof
+        if output:
+            prof.export_chrome_trace(output)
+        else:
+            print(prof.key_averages().table(sort_by='cpu_time_total', row_limit=limit))
+    else:
+        raise ValueError(f"Unknown profiler kind: {kind}")
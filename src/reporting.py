@@ -0,0 +1,184 @@
+"""Headless, parallel report rendering for job-queue sweep results.
+
+Each distinct environment configuration of a sweep becomes one comparison
+figure with a multi-seed curve per agent configuration. Figures are drawn on
+standalone Agg canvases (never through pyplot, so no backend is switched) in
+a process pool, and a figure is only re-rendered when the content of its
+input files changed.
+
+    python -m src.reporting /shared/sweep reports/sweep --workers 8
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+# Bump when the figure layout changes so cached figures are re-rendered
+RENDER_VERSION = 1
+CACHE_FILE = 'report_cache.json'
+
+@dataclass
+class FigureSpec:
+    """One comparison figure and the result files it is drawn from."""
+    name: str
+    title: str
+    series: Dict[str, List[str]]  # curve label -> result files (one per seed)
+
+def _describe(kwargs: Dict[str, Any]) -> str:
+    return ', '.join(f'{k}={v}' for k, v in sorted(kwargs.items()))
+
+def discover_figures(queue_root: str) -> List[FigureSpec]:
+    """Group finished jobs of a queue into comparison figures.
+
+    Uses the small job specs in ``done/``, so no result file is loaded.
+    """
+    groups: Dict[Tuple, Dict[str, List[str]]] = {}
+    titles: Dict[Tuple, str] = {}
+    done = os.path.join(queue_root, 'done')
+    for name in sorted(os.listdir(done)):
+        if not name.endswith('.json'):
+            continue
+        with open(os.path.join(done, name)) as f:
+            job = json.load(f)
+        key = (job.get('sweep', ''), job['env_type'], json.dumps(job['env_kwargs'], sort_keys=True),
+               job['episodes'])
+        label = job['agent_type'].replace('RLAgent', '')
+        if job['agent_kwargs']:
+            label += f" ({_describe(job['agent_kwargs'])})"
+        groups.setdefault(key, {}).setdefault(label, []).append(
+            os.path.join(queue_root, 'results', job['id'] + '.pkl'))
+        titles[key] = ' '.join(filter(None, [job.get('sweep'), job['env_type'],
+                                             f"({_describe(job['env_kwargs'])})"]))
+
+    specs = []
+    for key, series in groups.items():
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', titles[key]).strip('_')
+        specs.append(FigureSpec(name=f'{slug}_{key[3]}ep', title=titles[key], series=series))
+    return sorted(specs, key=lambda spec: spec.name)
+
+def _file_digest(path: str, file_cache: Dict[str, Any]) -> str:
+    """Content hash of a file, reusing the cached hash while size and mtime match."""
+    stat = os.stat(path)
+    cached = file_cache.get(path)
+    if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+        return cached['sha256']
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    file_cache[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                        'sha256': digest.hexdigest()}
+    return digest.hexdigest()
+
+def figure_hash(spec: FigureSpec, file_cache: Dict[str, Any], window: int, dpi: int) -> str:
+    """Hash of everything a figure depends on."""
+    digest = hashlib.sha256(json.dumps([RENDER_VERSION, spec.title, window, dpi]).encode())
+    for label in sorted(spec.series):
+        digest.update(label.encode())
+        for path in sorted(spec.series[label]):
+            digest.update(_file_digest(path, file_cache).encode())
+    return digest.hexdigest()
+
+def render_figure(spec: FigureSpec, output_dir: str, window: int = 50, dpi: int = 100
+                  ) -> Dict[str, Dict[str, float]]:
+    """Render one figure and return each curve's final-episode statistics."""
+    from .aggregation import aggregate_results, iter_results
+    from .utils import plot_aggregate_comparison
+
+    labels = {path: label for label, paths in spec.series.items() for path in paths}
+    summaries = aggregate_results(iter_results(labels), group_by=lambda meta: labels[meta['path']],
+                                  window=window)
+    plot_aggregate_comparison(summaries, os.path.join(output_dir, spec.name + '.png'),
+                              show=False, title=spec.title, dpi=dpi)
+    return {label: {
+        'seeds': int(by_metric['reward'].n_seeds.max()),
+        'final_reward': float(by_metric['reward'].mean[-1]),
+        'final_reward_ci': [float(by_metric['reward'].ci_low[-1]),
+                            float(by_metric['reward'].ci_high[-1])],
+        'final_one_box_rate': float(by_metric['one_box_rate'].mean[-1])
+    } for label, by_metric in summaries.items()}
+
+def write_index(specs: List[FigureSpec], metrics: Dict[str, Any], output_dir: str):
+    """Write ``index.html`` listing every figure with its final statistics."""
+    parts = ['<!DOCTYPE html><html><head><meta charset="utf-8"><title>Experiment report</title>',
+             '<style>body{font-family:sans-serif}table{border-collapse:collapse}'
+             'td,th{border:1px solid #ccc;padding:2px 8px}img{max-width:100%}</style>',
+             '</head><body><h1>Experiment report</h1><ul>']
+    for spec in specs:
+        parts.append(f'<li><a href="#{spec.name}">{html.escape(spec.title)}</a></li>')
+    parts.append('</ul>')
+    for spec in specs:
+        parts.append(f'<h2 id="{spec.name}">{html.escape(spec.title)}</h2>')
+        parts.append('<table><tr><th>agent</th><th>seeds</th><th>final reward</th>'
+                     '<th>95% CI</th><th>final one-box rate</th></tr>')
+        for label, stats in metrics.get(spec.name, {}).items():
+            low, high = stats['final_reward_ci']
+            parts.append(f"<tr><td>{html.escape(label)}</td><td>{stats['seeds']}</td>"
+                         f"<td>{stats['final_reward']:.0f}</td><td>{low:.0f} - {high:.0f}</td>"
+                         f"<td>{stats['final_one_box_rate']:.3f}</td></tr>")
+        parts.append(f'</table><img src="{spec.name}.png" alt="{html.escape(spec.title)}">')
+    parts.append('</body></html>')
+    with open(os.path.join(output_dir, 'index.html'), 'w') as f:
+        f.write('\n'.join(parts))
+
+def render_report(queue_root: str, output_dir: str, workers: Optional[int] = None,
+                  window: int = 50, dpi: int = 100, force: bool = False) -> List[str]:
+    """Render all out-of-date figures of a sweep and the index page.
+
+    Returns the names of the figures that were (re-)rendered.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    cache_path = os.path.join(output_dir, CACHE_FILE)
+    cache = {'files': {}, 'figures': {}}
+    if os.path.exists(cache_path):
+        with open(cache_path) as f:
+            cache = json.load(f)
+
+    specs = discover_figures(queue_root)
+    stale = {}
+    for spec in specs:
+        digest = figure_hash(spec, cache['files'], window, dpi)
+        cached = cache['figures'].get(spec.name)
+        image = os.path.join(output_dir, spec.name + '.png')
+        if force or not cached or cached['hash'] != digest or not os.path.exists(image):
+            stale[spec.name] = (spec, digest)
+
+    if stale:
+        todo = [spec for spec, _ in stale.values()]
+        args = (todo, [output_dir] * len(todo), [window] * len(todo), [dpi] * len(todo))
+        if workers == 1:
+            rendered = list(map(render_figure, *args))
+        else:
+            with ProcessPoolExecutor(workers) as executor:
+                rendered = list(executor.map(render_figure, *args))
+        for spec, metrics in zip(todo, rendered):
+            cache['figures'][spec.name] = {'hash': stale[spec.name][1], 'metrics': metrics}
+
+    write_index(specs, {name: entry['metrics'] for name, entry in cache['figures'].items()},
+                output_dir)
+    with open(cache_path, 'w') as f:
+        json.dump(cache, f)
+    return list(stale)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a sweep report")
+    parser.add_argument('queue_root', help='job queue directory with finished jobs')
+    parser.add_argument('output_dir')
+    parser.add_argument('--workers', type=int, help='rendering processes (default: CPU count)')
+    parser.add_argument('--window', type=int, default=50, help='moving average window')
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--force', action='store_true', help='re-render every figure')
+    args = parser.parse_args(argv)
+
+    rendered = render_report(args.queue_root, args.output_dir, args.workers, args.window,
+                             args.dpi, args.force)
+    print(f"Rendered {len(rendered)} figure(s); report at "
+          f"{os.path.join(args.output_dir, 'index.html')}")
+
+if __name__ == "__main__":
+    main()
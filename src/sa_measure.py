@@ -1,9 +1,26 @@
+from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from .integration import gauss_hermite_quadrature
-from typing import cast, Callable, Optional, Union
+from .profiling import record_call
+from functools import reduce
+from typing import cast, Callable, Dict, List, Optional, Sequence, Tuple, Union
 import torch as th
 import torch.distributions as thd
 
+def _expectation(mu: thd.Distribution, f: Callable[[th.Tensor], th.Tensor], n: int) -> th.Tensor:
+    """Expected value of ``f`` under a (batched) probability distribution."""
+    if isinstance(mu, thd.Bernoulli):
+        p = cast(th.Tensor, mu.probs)
+        return p * f(th.ones_like(p)) + (1 - p) * f(th.zeros_like(p))
+    elif isinstance(mu, thd.Categorical):
+        p = cast(th.Tensor, mu.probs)
+        support = th.arange(p.shape[-1], device=p.device)
+        return (p * f(support)).sum(-1)
+    elif isinstance(mu, thd.Normal):
+        return gauss_hermite_quadrature(mu, f, n=n)
+    else:
+        raise NotImplementedError(f"Expected values not implemented for {type(mu)}")
+
 @dataclass
 class SaMeasure:
     """Scale-and-bias transformed probability measure."""
@@ -15,33 +32,201 @@ class SaMeasure:
         """Entropy of underlying probability distribution."""
         return self.mu.entropy()
 
-    def __add__(self, other: Union[float, "SaMeasure", th.Tensor]) -> "SaMeasure":
-        if isinstance(other, (float, th.Tensor)):
+    def __add__(self, other: Union[float, "SaMeasure", "SaMeasureExpr", th.Tensor]
+                ) -> Union["SaMeasure", "SaMeasureExpr"]:
+        if isinstance(other, (int, float, th.Tensor)):
             new_bias = self.bias + other if self.bias is not None else other
             return SaMeasure(self.mu, self.scale, th.as_tensor(new_bias))
-        elif isinstance(other, SaMeasure):
-            raise NotImplementedError("Addition of sa-measures not implemented")
+        elif isinstance(other, (SaMeasure, SaMeasureExpr)):
+            return SaMeasureSum([self, other])
         else:
             raise TypeError(f"Cannot add {type(other)} to SaMeasure")
 
+    # Lets ``sum(measures)`` and ``1.0 + m`` work
+    __radd__ = __add__
+
     def __call__(self, f: Callable[[th.Tensor], th.Tensor], n: int = 20) -> th.Tensor:
         """Compute expected value of function wrt this sa-measure."""
-        if isinstance(self.mu, thd.Bernoulli):
-            p = cast(th.Tensor, self.mu.probs)
-            E = p * f(th.ones_like(p)) + (1 - p) * f(th.zeros_like(p))
-        elif isinstance(self.mu, thd.Normal):
-            E = gauss_hermite_quadrature(self.mu, f, n=n)
-        else:
-            raise NotImplementedError(f"Expected values not implemented for {type(self.mu)}")
-
+        record_call('SaMeasure.__call__')
+        E = _expectation(self.mu, f, n)
         if self.scale is not None:
             E = E * self.scale
         if self.bias is not None:
             E = E + self.bias
         return E
 
+    @property
+    def batch_shape(self) -> th.Size:
+        """Batch shape of the underlying distribution."""
+        return self.mu.batch_shape
+
     def __mul__(self, scalar: Union[float, th.Tensor]) -> "SaMeasure":
         """Scalar multiplication of sa-measures."""
         new_scale = self.scale * scalar if self.scale is not None else scalar
         new_bias = self.bias * scalar if self.bias is not None else None
         return SaMeasure(self.mu, new_scale, new_bias)
+
+    __rmul__ = __mul__
+
+Coefficient = Union[float, th.Tensor]
+
+class SaMeasureExpr(ABC):
+    """Lazy linear combination of sa-measures.
+
+    Sums, scalings, biases and mixtures of sa-measures build a tree of
+    these nodes instead of evaluating anything. Evaluating the tree
+    flattens it to ``sum_k c_k E_{mu_k}[f] + b``, merges terms that share a
+    distribution object and evaluates all distributions of one family
+    (Normal, Bernoulli, Categorical with equal support) as a single batched
+    quadrature, so the leaves' batch shapes must broadcast together.
+    """
+
+    @abstractmethod
+    def _terms(self) -> Tuple[List[Tuple[Coefficient, thd.Distribution]], Coefficient]:
+        """Flattened ``([(c_k, mu_k), ...], b)``."""
+
+    @property
+    def batch_shape(self) -> th.Size:
+        """Broadcast batch shape of all leaves, coefficients and biases."""
+        terms, bias = self._terms()
+        shapes = [mu.batch_shape for _, mu in terms]
+        shapes += [th.as_tensor(c).shape for c, _ in terms] + [th.as_tensor(bias).shape]
+        return th.Size(th.broadcast_shapes(*shapes))
+
+    def entropy(self) -> th.Tensor:
+        raise NotImplementedError("Entropy of sa-measure expressions not implemented")
+
+    def __add__(self, other: Union[float, SaMeasure, "SaMeasureExpr", th.Tensor]) -> "SaMeasureExpr":
+        if isinstance(other, (SaMeasure, SaMeasureExpr)):
+            return SaMeasureSum([self, other])
+        elif isinstance(other, (int, float, th.Tensor)):
+            return BiasedSaMeasure(self, other)
+        else:
+            raise TypeError(f"Cannot add {type(other)} to SaMeasureExpr")
+
+    __radd__ = __add__
+
+    def __mul__(self, scalar: Union[float, th.Tensor]) -> "SaMeasureExpr":
+        return ScaledSaMeasure(self, scalar)
+
+    __rmul__ = __mul__
+
+    def _fuse(self) -> Tuple[List[Tuple[thd.Distribution, th.Tensor]], th.Tensor]:
+        """Stacked distribution and coefficients per family, plus the total bias."""
+        terms, bias = self._terms()
+        coefficients: Dict[int, Coefficient] = {}
+        measures: Dict[int, thd.Distribution] = {}
+        for c, mu in terms:
+            key = id(mu)
+            coefficients[key] = coefficients[key] + c if key in measures else c
+            measures[key] = mu
+
+        groups: Dict[object, List[int]] = {}
+        for key, mu in measures.items():
+            groups.setdefault(_family(mu) or key, []).append(key)
+        return [(_stack_distributions([measures[key] for key in keys]),
+                 _stack([th.as_tensor(coefficients[key]) for key in keys]))
+                for keys in groups.values()], th.as_tensor(bias)
+
+    def __call__(self, f: Callable[[th.Tensor], th.Tensor], n: int = 20) -> th.Tensor:
+        """Compute expected value of function wrt the combined sa-measure.
+
+        The flattened form is built on the first call and reused, so the
+        expression should not be modified afterwards.
+        """
+        record_call('SaMeasureExpr.__call__')
+        if getattr(self, '_fused', None) is None:
+            self._fused = self._fuse()
+        groups, E = self._fused
+        for mu, weights in groups:
+            values = _expectation(mu, f, n)
+            ndim = max(values.dim(), weights.dim())
+            E = E + (_pad_batch(weights.to(values.dtype), ndim) * _pad_batch(values, ndim)).sum(0)
+        return E
+
+@dataclass
+class SaMeasureSum(SaMeasureExpr):
+    """Sum of sa-measures (or expressions)."""
+    children: List[Union[SaMeasure, SaMeasureExpr]]
+
+    def __add__(self, other):
+        if isinstance(other, (SaMeasure, SaMeasureExpr)):
+            return SaMeasureSum(self.children + [other])
+        return super().__add__(other)
+
+    def _terms(self):
+        terms, bias = [], 0.0
+        for child in self.children:
+            child_terms, child_bias = _terms(child)
+            terms += child_terms
+            bias = bias + child_bias
+        return terms, bias
+
+@dataclass
+class ScaledSaMeasure(SaMeasureExpr):
+    """Sa-measure expression multiplied by a scalar (or batch of scalars)."""
+    child: Union[SaMeasure, SaMeasureExpr]
+    factor: Coefficient
+
+    def _terms(self):
+        terms, bias = _terms(self.child)
+        return [(c * self.factor, mu) for c, mu in terms], bias * self.factor
+
+@dataclass
+class BiasedSaMeasure(SaMeasureExpr):
+    """Sa-measure expression plus a constant (or batch of constants)."""
+    child: Union[SaMeasure, SaMeasureExpr]
+    bias: Coefficient
+
+    def _terms(self):
+        terms, bias = _terms(self.child)
+        return terms, bias + self.bias
+
+def mixture(measures: Sequence[Union[SaMeasure, SaMeasureExpr]],
+            weights: Optional[th.Tensor] = None) -> SaMeasureSum:
+    """Lazy mixture ``sum_j weights[..., j] * measures[j]`` (uniform by default).
+
+    Batched ``weights`` of shape ``(K, M)`` describe K mixtures of the same
+    M components, e.g. the extreme points of a composite credal set; their
+    components are still evaluated only once.
+    """
+    if weights is None:
+        weights = th.full((len(measures),), 1.0 / len(measures))
+    return SaMeasureSum([ScaledSaMeasure(m, weights[..., j]) for j, m in enumerate(measures)])
+
+def _terms(measure: Union[SaMeasure, SaMeasureExpr]
+           ) -> Tuple[List[Tuple[Coefficient, thd.Distribution]], Coefficient]:
+    if isinstance(measure, SaMeasureExpr):
+        return measure._terms()
+    scale = measure.scale if measure.scale is not None else 1.0
+    bias = measure.bias if measure.bias is not None else 0.0
+    return [(scale, measure.mu)], bias
+
+def _family(mu: thd.Distribution) -> Optional[Tuple]:
+    """Key of distributions whose parameters can be stacked into one batch."""
+    if isinstance(mu, (thd.Normal, thd.Bernoulli)):
+        return (type(mu),)
+    if isinstance(mu, thd.Categorical):
+        return (thd.Categorical, mu.probs.shape[-1])
+    return None
+
+def _stack(tensors: List[th.Tensor]) -> th.Tensor:
+    """Broadcast, type-promote and stack along a new leading dimension."""
+    dtype = reduce(th.promote_types, [t.dtype for t in tensors])
+    return th.stack([t.to(dtype) for t in th.broadcast_tensors(*tensors)])
+
+def _pad_batch(x: th.Tensor, ndim: int) -> th.Tensor:
+    """Insert singleton dimensions after the leading one up to ``ndim`` dimensions."""
+    return x.reshape(x.shape[:1] + (1,) * (ndim - x.dim()) + x.shape[1:])
+
+def _stack_distributions(mus: List[thd.Distribution]) -> thd.Distribution:
+    """One distribution with the parameters of ``mus`` stacked along dimension 0."""
+    if len(mus) == 1:
+        return mus[0].expand(th.Size([1]) + mus[0].batch_shape)
+    if isinstance(mus[0], thd.Normal):
+        return thd.Normal(_stack([mu.loc for mu in mus]), _stack([mu.scale for mu in mus]),
+                          validate_args=False)
+    probs = [cast(th.Tensor, mu.probs) for mu in mus]
+    if isinstance(mus[0], thd.Bernoulli):
+        return thd.Bernoulli(probs=_stack(probs), validate_args=False)
+    return thd.Categorical(probs=_stack(probs), validate_args=False)
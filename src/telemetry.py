@@ -0,0 +1,201 @@
+"""Live training telemetry exported without blocking the training loop.
+
+``TelemetrySink.record`` is called once per episode and only updates O(1)
+rolling statistics. At most once per ``interval`` seconds it hands a small
+snapshot to a background thread, which renders Prometheus text exposition
+format and writes it to a textfile (e.g. for node_exporter's textfile
+collector) and/or serves it at ``http://host:port/metrics``. If the
+background thread falls behind, older snapshots are dropped, never queued.
+"""
+import math
+import os
+import queue
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+METRICS = {
+    'episodes_total': ('counter', 'Episodes completed'),
+    'episodes_per_second': ('gauge', 'Episode throughput since the previous snapshot'),
+    'one_box_rate': ('gauge', 'One-boxing rate over the rolling window'),
+    'mean_reward': ('gauge', 'Mean reward over the rolling window'),
+    'q_value_spread': ('gauge', 'Max minus min Q-value in the current state'),
+    'predictor_accuracy': ('gauge', 'Empirical predictor accuracy reported by the environment'),
+}
+
+def _format_value(value: float, kind: str) -> str:
+    """Exact sample value: integral counters as integers, gauges at full precision."""
+    if kind == 'counter' and float(value).is_integer():
+        return str(int(value))
+    value = float(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value)
+
+def _escape_label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_prometheus(snapshots: Dict[str, Dict[str, float]], prefix: str = 'ibrl') -> str:
+    """Prometheus text format for the latest snapshot of each run."""
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f'# HELP {prefix}_{name} {help_text}')
+        lines.append(f'# TYPE {prefix}_{name} {kind}')
+        for run_id, snapshot in sorted(snapshots.items()):
+            if snapshot.get(name) is not None:
+                lines.append(f'{prefix}_{name}{{run="{_escape_label(run_id)}"}} '
+                             f'{_format_value(snapshot[name], kind)}')
+    return '\n'.join(lines) + '\n'
+
+class TelemetrySink:
+    """Rolling training metrics published from a background thread."""
+
+    def __init__(self, run_id: str = 'run', textfile: Optional[str] = None,
+                 port: Optional[int] = None, host: str = '127.0.0.1',
+                 interval: float = 1.0, window: int = 100, one_box_action: int = 0):
+        self.run_id = run_id
+        self.textfile = textfile
+        self.interval = interval
+        self.one_box_action = one_box_action
+
+        self._actions = deque(maxlen=window)
+        self._rewards = deque(maxlen=window)
+        self._one_box_sum = 0
+        self._reward_sum = 0.0
+        self._episodes = 0
+        self._predictor_accuracy = None
+        self._last_time = time.monotonic()
+        self._last_episodes = 0
+        self._next_publish = self._last_time + interval
+
+        self._queue: queue.Queue = queue.Queue(maxsize=1)
+        self._published = 0
+        self._written = 0
+        self._written_cond = threading.Condition()
+        self._latest = format_prometheus({})
+        self._stop = threading.Event()
+        self._writer = threading.Thread(target=self._run, name='telemetry-writer', daemon=True)
+        self._writer.start()
+
+        self._server = None
+        self.port = None
+        if port is not None:
+            self._server = ThreadingHTTPServer((host, port), self._handler())
+            self.port = self._server.server_address[1]
+            threading.Thread(target=self._server.serve_forever, name='telemetry-http',
+                             daemon=True).start()
+
+    def record(self, episode: int, state: int, action: int, reward: float,
+               info: Dict[str, Any], agent=None):
+        """Account for one finished episode (cheap; called from the hot loop)."""
+        if len(self._actions) == self._actions.maxlen:
+            self._one_box_sum -= self._actions[0] == self.one_box_action
+            self._reward_sum -= self._rewards[0]
+        self._actions.append(action)
+        self._rewards.append(reward)
+        self._one_box_sum += action == self.one_box_action
+        self._reward_sum += reward
+        self._episodes = episode + 1
+        self._predictor_accuracy = info.get('predictor_accuracy', self._predictor_accuracy)
+
+        now = time.monotonic()
+        if now >= self._next_publish:
+            self._publish(now, state, agent)
+
+    def _publish(self, now: float, state: Optional[int] = None, agent=None):
+        elapsed = now - self._last_time
+        spread = None
+        if state is not None and agent is not None and hasattr(agent, 'q_values') and agent.actions:
+            q = [agent.q_values[state][a] for a in agent.actions]
+            spread = max(q) - min(q)
+        n = len(self._actions)
+        snapshot = {
+            'episodes_total': self._episodes,
+            'episodes_per_second': (self._episodes - self._last_episodes) / elapsed if elapsed > 0 else None,
+            'one_box_rate': self._one_box_sum / n if n else None,
+            'mean_reward': self._reward_sum / n if n else None,
+            'q_value_spread': spread,
+            'predictor_accuracy': self._predictor_accuracy,
+        }
+        self._last_time = now
+        self._last_episodes = self._episodes
+        self._next_publish = now + self.interval
+        self._published += 1
+        snapshot = (self._published, snapshot)
+        try:
+            self._queue.put_nowait(snapshot)
+        except queue.Full:
+            # Replace the snapshot the writer has not picked up yet
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(snapshot)
+            except queue.Full:
+                pass
+
+    def flush(self, state: Optional[int] = None, agent=None, timeout: float = 5.0):
+        """Publish the current statistics now and wait until they are written."""
+        self._publish(time.monotonic(), state, agent)
+        target = self._published
+        with self._written_cond:
+            self._written_cond.wait_for(lambda: self._written >= target, timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                seq, snapshot = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            self._latest = format_prometheus({self.run_id: snapshot})
+            if self.textfile:
+                tmp = f'{self.textfile}.tmp'
+                with open(tmp, 'w') as f:
+                    f.write(self._latest)
+                os.replace(tmp, self.textfile)
+            with self._written_cond:
+                self._written = seq
+                self._written_cond.notify_all()
+
+    def metrics_text(self) -> str:
+        """Latest exported metrics in Prometheus text format."""
+        return self._latest
+
+    def _handler(self):
+        sink = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = sink.metrics_text().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return MetricsHandler
+
+    def close(self):
+        self._stop.set()
+        self._writer.join()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
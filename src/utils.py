@@ -1,37 +1,133 @@
 import torch as th
-import matplotlib.pyplot as plt
 import numpy as np
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, Optional, Union
+from .ib_rl_agent import InfrabayesianRLAgent, ClassicalRLAgent
+from .newcomb_env import NewcombEnvironment, LogicalPredictorEnv, MultiPredictorEnv
+from .profiling import Profiler, NULL_PROFILER
+from .checkpoint import Checkpointer, load_checkpoint, restore_state
+from .early_stopping import ConvergenceMonitor
+from .telemetry import TelemetrySink
 
-def run_experiment(agent, env, episodes: int = 1000, verbose: bool = True) -> Dict[str, List]:
-    """Run RL experiment and collect comprehensive results."""
+AGENT_TYPES = {
+    'InfrabayesianRLAgent': InfrabayesianRLAgent,
+    'ClassicalRLAgent': ClassicalRLAgent
+}
+
+ENV_TYPES = {
+    'NewcombEnvironment': NewcombEnvironment,
+    'LogicalPredictorEnv': LogicalPredictorEnv,
+    'MultiPredictorEnv': MultiPredictorEnv
+}
+
+def build_agent(agent_type: str, actions: List[int] = [0, 1], **kwargs):
+    """Construct an agent from its class name and keyword arguments."""
+    if agent_type not in AGENT_TYPES:
+        raise ValueError(f"Unknown agent type: {agent_type}")
+    return AGENT_TYPES[agent_type](list(actions), **kwargs)
+
+def build_env(env_type: str, **kwargs):
+    """Construct an environment from its class name and keyword arguments."""
+    if env_type not in ENV_TYPES:
+        raise ValueError(f"Unknown environment type: {env_type}")
+    return ENV_TYPES[env_type](**kwargs)
+
+def run_experiment(agent, env, episodes: int = 1000, verbose: bool = True,
+                   profiler: Optional[Profiler] = None,
+                   checkpointer: Optional[Checkpointer] = None,
+                   resume_from: Optional[Union[str, Dict[str, Any]]] = None,
+                   early_stopping: Optional[ConvergenceMonitor] = None,
+                   telemetry: Optional[TelemetrySink] = None) -> Dict[str, List]:
+    """Run RL experiment and collect comprehensive results.
+
+    Pass a ``Profiler`` to record per-phase timings of the episode loop and
+    quadrature call counts; without one the loop is not instrumented.
+    A ``Checkpointer`` snapshots agent, environment and RNG state every
+    ``checkpointer.every`` episodes; ``resume_from`` (a checkpoint file,
+    directory or already loaded snapshot) continues such a run exactly where
+    the snapshot was taken.
+    With an ``early_stopping`` monitor the run ends as soon as the monitor
+    establishes convergence; ``stopped_episode`` then holds the number of
+    episodes after which it converged (when resuming, possibly within the
+    restored history, in which case no further episodes are run). A ``TelemetrySink`` receives every episode and exports
+    rolling metrics from its own thread.
+    """
+    prof = profiler if profiler is not None else NULL_PROFILER
     rewards = []
     actions = []
     predictions = []
     q_values_history = []
+    track_q_values = hasattr(agent, 'q_values')
+    start_episode = 0
+    
+    if resume_from is not None:
+        checkpoint = resume_from if isinstance(resume_from, dict) else load_checkpoint(resume_from)
+        partial = restore_state(checkpoint, agent, env)
+        rewards = partial['rewards']
+        actions = partial['actions']
+        predictions = partial['predictions']
+        q_values_history = partial['q_values']
+        start_episode = checkpoint['episode']
+        if early_stopping is not None:
+            for action, reward in zip(actions, rewards):
+                if early_stopping.update(action, reward):
+                    break
+    
+    # A run that already converged within the restored history is not continued
+    stopped_episode = early_stopping.stopped_episode if early_stopping is not None else None
+    if verbose and stopped_episode is not None:
+        print(f"Converged after {stopped_episode} episodes")
+    last_episode = episodes if stopped_episode is None else start_episode
+    state = None
+    with prof:
+        for episode in range(start_episode, last_episode):
+            with prof.phase('reset'):
+                state = env.reset()
+            with prof.phase('select_action'):
+                action = agent.select_action(state)
+            with prof.phase('step'):
+                next_state, reward, done, info = env.step(action)
+            
+            with prof.phase('update'):
+                agent.update(state, action, reward, next_state)
+            
+            rewards.append(reward)
+            actions.append(action)
+            predictions.append(info.get('predicted', -1))
+            
+            if telemetry is not None:
+                with prof.phase('telemetry'):
+                    telemetry.record(episode, state, action, reward, info, agent)
+            
+            # Track Q-values for analysis
+            if track_q_values:
+                with prof.phase('q_snapshot'):
+                    q_vals = {a: agent.q_values[state][a] for a in agent.actions}
+                    q_values_history.append(q_vals.copy())
+            
+            if verbose and episode % 200 == 0 and episode > 0:
+                recent_rewards = rewards[-100:] if len(rewards) >= 100 else rewards
+                recent_actions = actions[-100:] if len(actions) >= 100 else actions
+                avg_reward = sum(recent_rewards) / len(recent_rewards)
+                one_box_rate = sum(1 for a in recent_actions if a == 0) / len(recent_actions)
+                print(f"Episode {episode}: Reward={avg_reward:.0f}, One-box={one_box_rate:.2f}")
+            
+            if checkpointer is not None and checkpointer.due(episode + 1):
+                with prof.phase('checkpoint'):
+                    checkpointer.save(agent, env, episode + 1, {
+                        'rewards': rewards, 'actions': actions,
+                        'predictions': predictions, 'q_values': q_values_history
+                    })
+            
+            if early_stopping is not None and early_stopping.update(action, reward):
+                stopped_episode = episode + 1
+                if verbose:
+                    print(f"Converged after {stopped_episode} episodes")
+                break
     
-    for episode in range(episodes):
-        state = env.reset()
-        action = agent.select_action(state)
-        next_state, reward, done, info = env.step(action)
-        
-        agent.update(state, action, reward, next_state)
-        
-        rewards.append(reward)
-        actions.append(action)
-        predictions.append(info.get('predicted', -1))
-        
-        # Track Q-values for analysis
-        if hasattr(agent, 'q_values'):
-            q_vals = {a: agent.q_values[state][a] for a in agent.actions}
-            q_values_history.append(q_vals.copy())
-        
-        if verbose and episode % 200 == 0 and episode > 0:
-            recent_rewards = rewards[-100:] if len(rewards) >= 100 else rewards
-            recent_actions = actions[-100:] if len(actions) >= 100 else actions
-            avg_reward = sum(recent_rewards) / len(recent_rewards)
-            one_box_rate = sum(1 for a in recent_actions if a == 0) / len(recent_actions)
-            print(f"Episode {episode}: Reward={avg_reward:.0f}, One-box={one_box_rate:.2f}")
+    if checkpointer is not None:
+        checkpointer.wait()
+    if telemetry is not None:
+        telemetry.flush(state, agent)
     
     return {
         'rewards': rewards,
@@ -39,7 +135,8 @@ def run_experiment(agent, env, episodes: int = 1000, verbose: bool = True) -> Di
         'predictions': predictions,
         'q_values': q_values_history,
         'final_policy': get_final_policy(agent),
-        'convergence_metrics': calculate_convergence_metrics(actions, rewards)
+        'convergence_metrics': calculate_convergence_metrics(actions, rewards),
+        'stopped_episode': stopped_episode
     }
 
 def get_final_policy(agent) -> Dict[int, float]:
@@ -52,15 +149,16 @@ def get_final_policy(agent) -> Dict[int, float]:
         return policy
     return {}
 
-def calculate_convergence_metrics(actions: List[int], rewards: List[float]) -> Dict[str, float]:
-    """Calculate convergence and performance metrics."""
-    if len(actions) < 100:
+def calculate_convergence_metrics(actions: List[int], rewards: List[float],
+                                  window: int = 100) -> Dict[str, float]:
+    """Calculate convergence and performance metrics over the last ``window`` episodes."""
+    if len(actions) < window or window < 1:
         return {}
     
-    final_100 = actions[-100:]
+    final_100 = actions[-window:]
     one_box_rate = sum(1 for a in final_100 if a == 0) / len(final_100)
     
-    final_rewards = rewards[-100:]
+    final_rewards = rewards[-window:]
     avg_reward = sum(final_rewards) / len(final_rewards)
     
     # Measure consistency (lower variance = more consistent)
@@ -73,8 +171,11 @@ def calculate_convergence_metrics(actions: List[int], rewards: List[float]) -> D
         'optimal_gap': abs(1000000.0 - avg_reward) / 1000000.0
     }
 
-def plot_comparison_results(classical_results: Dict, ib_results: Dict, save_path: str = None):
+def plot_comparison_results(classical_results: Dict, ib_results: Dict, save_path: str = None,
+                            show: bool = True):
     """Plot comparison between classical and infrabayesian agents."""
+    # Imported lazily so training processes never load matplotlib
+    import matplotlib.pyplot as plt
     fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 10))
     
     # Rewards over time
@@ -136,7 +237,57 @@ def plot_comparison_results(classical_results: Dict, ib_results: Dict, save_path
     
     if save_path:
         plt.savefig(save_path, dpi=300, bbox_inches='tight')
-    plt.show()
+    if show:
+        plt.show()
+    else:
+        plt.close(fig)
+
+def plot_aggregate_comparison(summaries: Dict[str, Dict[str, Any]], save_path: str = None,
+                              show: bool = True, title: str = None, dpi: int = 300):
+    """Plot multi-seed means with bootstrap CIs and quantile bands per agent.
+
+    ``summaries`` maps an agent label to its per-metric ``AggregateSummary``
+    (as returned by ``aggregation.aggregate_results``). With ``show=False``
+    the figure is drawn on a standalone Agg canvas, without pyplot, so the
+    caller's pyplot backend and figure state are left untouched.
+    """
+    if show:
+        import matplotlib.pyplot as plt
+        fig = plt.figure(figsize=(15, 5))
+    else:
+        from matplotlib.figure import Figure
+        fig = Figure(figsize=(15, 5))
+    axes = fig.subplots(1, 2)
+    if title:
+        fig.suptitle(title)
+    panels = [('reward', 'Average Reward Over Time', 'Reward', 1000000),
+              ('one_box_rate', 'One-Boxing Rate Over Time', 'One-Boxing Rate', 1.0)]
+    
+    for ax, (metric, panel_title, ylabel, optimal) in zip(axes, panels):
+        for label, by_metric in summaries.items():
+            summary = by_metric[metric]
+            episodes = np.arange(len(summary.mean))
+            line, = ax.plot(episodes, summary.mean,
+                            label=f'{label} (n={summary.n_seeds.max()})', alpha=0.9)
+            ax.fill_between(episodes, summary.ci_low, summary.ci_high, color=line.get_color(),
+                            alpha=0.3, linewidth=0)
+            levels = sorted(summary.quantiles)
+            if len(levels) >= 2:
+                ax.fill_between(episodes, summary.quantiles[levels[0]], summary.quantiles[levels[-1]],
+                                color=line.get_color(), alpha=0.1, linewidth=0)
+        ax.axhline(y=optimal, color='red', linestyle='--', alpha=0.5, label='Optimal')
+        ax.set_title(panel_title)
+        ax.set_xlabel('Episode')
+        ax.set_ylabel(ylabel)
+        ax.legend()
+        ax.grid(True)
+    
+    fig.tight_layout()
+    
+    if save_path:
+        fig.savefig(save_path, dpi=dpi, bbox_inches='tight')
+    if show:
+        plt.show()
 
 def moving_average(data: List[float], window: int) -> List[float]:
     """Calculate moving average."""
@@ -0,0 +1,373 @@
+import json
+import torch as th
+from src import InfrabayesianRLAgent, NewcombEnvironment, Profiler
+from src.utils import run_experiment
+
+def test_profiler_records_phases(tmp_path):
+    """Test per-phase timing and quadrature call counting."""
+    th.manual_seed(0)
+    profiler = Profiler()
+    run_experiment(InfrabayesianRLAgent([0, 1]), NewcombEnvironment(), episodes=20,
+                   verbose=False, profiler=profiler)
+    
+    for phase in ['reset', 'select_action', 'step', 'update', 'q_snapshot']:
+        assert profiler.phases[phase].count == 20
+    assert profiler.calls['gauss_hermite_quadrature'] > 0
+    assert profiler.calls['SaMeasure.__call__'] == profiler.calls['gauss_hermite_quadrature']
+    assert 'select_action' in profiler.summary()
+    
+    profiler.dump(tmp_path / 'profile.json')
+    data = json.loads((tmp_path / 'profile.json').read_text())
+    assert data['phases']['update']['count'] == 20
+
+def test_profiler_disabled_by_default():
+    """Test that a run without a profiler records nothing anywhere."""
+    from src import profiling
+    
+    run_experiment(InfrabayesianRLAgent([0, 1]), NewcombEnvironment(), episodes=5, verbose=False)
+    assert profiling._active is None
+    assert not profiling.NULL_PROFILER.calls and not profiling.NULL_PROFILER.phases
+    
+    # Inside an unrelated profiler scope the loop's phases are not attributed to it
+    with Profiler() as outer:
+        run_experiment(InfrabayesianRLAgent([0, 1]), NewcombEnvironment(), episodes=5,
+                       verbose=False)
+    assert not outer.phases
+    assert outer.calls['gauss_hermite_quadrature'] > 0
+    assert profiling._active is None
+    assert not profiling.NULL_PROFILER.calls and not profiling.NULL_PROFILER.phases
+
+def test_benchmark_regression_check():
+    """Test baseline comparison flags only slowdowns beyond the threshold."""
+    from benchmarks.run_benchmarks import compare_results
+    baseline = {'fast': 100.0, 'slow': 100.0, 'new_in_baseline': 5.0}
+    current = {'fast': 90.0, 'slow': 50.0}
+    assert compare_results(current, baseline, threshold=0.25) == {'slow': -0.5}
+
+def test_benchmark_cli_fails_on_regression(tmp_path):
+    """Test the benchmark CLI exit codes against saved, inflated and missing baselines."""
+    from benchmarks.run_benchmarks import main
+    baseline = tmp_path / 'baseline.json'
+    args = ['--baseline', str(baseline), '--min-time', '0.01', '--only', 'agents']
+    
+    assert main(args) == 0  # no baseline yet
+    assert main(args + ['--require-baseline']) == 1
+    assert main(args + ['--save-baseline']) == 0
+    
+    inflated = {key: value * 100 for key, value in json.loads(baseline.read_text()).items()}
+    baseline.write_text(json.dumps(inflated))
+    assert main(args + ['--require-baseline']) == 1
+
+def test_checkpoint_resume_is_exact(tmp_path):
+    """Test that a resumed run reproduces an uninterrupted run exactly."""
+    from src import LogicalPredictorEnv
+    from src.checkpoint import Checkpointer
+    
+    th.manual_seed(1)
+    full_agent = InfrabayesianRLAgent([0, 1], epsilon=0.2)
+    full = run_experiment(full_agent, LogicalPredictorEnv(), episodes=60, verbose=False)
+    
+    th.manual_seed(1)
+    checkpointer = Checkpointer(str(tmp_path), every=25)
+    run_experiment(InfrabayesianRLAgent([0, 1], epsilon=0.2), LogicalPredictorEnv(),
+                   episodes=40, verbose=False, checkpointer=checkpointer)
+    checkpointer.close()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['checkpoint_000000000025.pkl']
+    
+    th.manual_seed(123)  # RNG state must come from the checkpoint
+    resumed_agent = InfrabayesianRLAgent([0, 1], epsilon=0.2)
+    resumed = run_experiment(resumed_agent, LogicalPredictorEnv(),
+                             episodes=60, verbose=False, resume_from=str(tmp_path))
+    
+    for key in ['rewards', 'actions', 'predictions', 'q_values', 'final_policy']:
+        assert resumed[key] == full[key]
+    assert sum(len(h) for hist in full_agent.q_history.values() for h in hist.values()) == 60
+    assert resumed_agent.state_dict()['q_history'] == full_agent.state_dict()['q_history']
+
+def test_checkpointer_packs_incrementally(tmp_path):
+    """Test that incremental checkpoints equal full snapshots of the same state."""
+    import numpy as np
+    from src import LogicalPredictorEnv
+    from src.checkpoint import Checkpointer, capture_state, load_checkpoint
+    
+    agent = InfrabayesianRLAgent([0, 1], epsilon=0.2)
+    env = LogicalPredictorEnv()
+    results = {'rewards': [], 'actions': [], 'predictions': [], 'q_values': []}
+    checkpointer = Checkpointer(str(tmp_path), every=10, keep=5)
+    for episode in range(30):
+        state = env.reset()
+        action = agent.select_action(state)
+        _, reward, _, info = env.step(action)
+        agent.update(state, action, reward, state)
+        results['rewards'].append(reward)
+        results['actions'].append(action)
+        results['predictions'].append(info['predicted'])
+        results['q_values'].append(dict(agent.q_values[state]))
+        if checkpointer.due(episode + 1):
+            checkpointer.save(agent, env, episode + 1, results)
+            checkpointer.wait()
+            expected = capture_state(agent, env, episode + 1, results)
+            saved = load_checkpoint(checkpointer.path(episode + 1))
+            for key, value in expected['results'].items():
+                assert np.array_equal(saved['results'][key], value)
+            assert {k: v.tolist() if isinstance(v, np.ndarray) else v
+                    for k, v in saved['env'].items()} == expected['env']
+            assert saved['agent'] == expected['agent']
+    checkpointer.close()
+
+def test_convergence_monitor():
+    """Test sequential test stops on a plateau but not on a drifting run."""
+    from src.early_stopping import ConvergenceMonitor
+    
+    plateau = ConvergenceMonitor(window=50, min_episodes=100)
+    stops = [plateau.update(0, 1000000.0) for _ in range(300)]
+    assert plateau.stopped_episode == 100
+    assert stops.index(True) == 99
+    
+    drifting = ConvergenceMonitor(window=50, min_episodes=100)
+    for episode in range(1000):
+        # One-box rate keeps shifting between consecutive windows
+        assert not drifting.update(0 if (episode // 50) % 2 else 1, 1000.0)
+
+def test_run_experiment_early_stopping():
+    """Test that run_experiment ends once convergence is established."""
+    from src import ClassicalRLAgent
+    from src.early_stopping import ConvergenceMonitor
+    
+    th.manual_seed(0)
+    results = run_experiment(ClassicalRLAgent([0, 1], epsilon=0.0), NewcombEnvironment(1.0),
+                             episodes=2000, verbose=False,
+                             early_stopping=ConvergenceMonitor(window=50, min_episodes=100))
+    assert results['stopped_episode'] is not None
+    assert len(results['actions']) == results['stopped_episode'] < 2000
+
+def test_resume_with_early_stopping_converged_in_history(tmp_path):
+    """Test that a resumed run whose history already converged is not continued."""
+    from src import ClassicalRLAgent
+    from src.checkpoint import Checkpointer
+    from src.early_stopping import ConvergenceMonitor
+    
+    th.manual_seed(0)
+    checkpointer = Checkpointer(str(tmp_path), every=300)
+    run_experiment(ClassicalRLAgent([0, 1], epsilon=0.0), NewcombEnvironment(1.0),
+                   episodes=300, verbose=False, checkpointer=checkpointer)
+    checkpointer.close()
+    
+    monitor = ConvergenceMonitor(window=50, min_episodes=100)
+    resumed = run_experiment(ClassicalRLAgent([0, 1], epsilon=0.0), NewcombEnvironment(1.0),
+                             episodes=1000, verbose=False, resume_from=str(tmp_path),
+                             early_stopping=monitor)
+    assert monitor.stopped_episode is not None and monitor.stopped_episode < 300
+    assert resumed['stopped_episode'] == monitor.stopped_episode
+    assert len(resumed['actions']) == 300
+
+def test_successive_halving():
+    """Test that successive halving promotes configs and continues training them."""
+    import math
+    from src.hyperparameter_search import successive_halving, sample_configs
+    
+    configs = sample_configs({'uncertainty_radius': [0.1, 0.2, 0.3], 'epsilon': [0.05, 0.1, 0.2]},
+                             n=9, seed=0)
+    assert len(configs) == 9
+    
+    result = successive_halving(configs, min_episodes=20, max_episodes=60, eta=3,
+                                n_workers=1, verbose=False)
+    
+    episodes = sorted(trial.episodes for trial in result.trials)
+    assert episodes == [20] * 6 + [60] * 3
+    # Survivors are continued, not retrained: 9 * 20 + 3 * 40
+    assert result.total_episodes == 300
+    assert result.best_config in configs
+    
+    # Promotion follows the first rung's scores
+    first_rung = sorted(result.trials, key=lambda t: t.rung_scores[20], reverse=True)
+    assert all(math.isfinite(t.rung_scores[20]) for t in result.trials)
+    assert first_rung[2].rung_scores[20] > first_rung[3].rung_scores[20]
+    assert {id(t) for t in first_rung[:3]} == {id(t) for t in result.trials if t.episodes == 60}
+
+def test_job_queue_local_workers(tmp_path):
+    """Test several worker processes drain a shared queue exactly once per job."""
+    import multiprocessing as mp
+    from src.job_queue import JobQueue, make_job, run_worker
+    
+    queue = JobQueue(str(tmp_path))
+    ids = {queue.submit(make_job('ClassicalRLAgent', 'NewcombEnvironment', seed, episodes=20))
+           for seed in range(6)}
+    assert len(ids) == 6
+    # Resubmitting an identical job is a no-op
+    queue.submit(make_job('ClassicalRLAgent', 'NewcombEnvironment', 0, episodes=20))
+    assert queue.status()['pending'] == 6
+    
+    workers = [mp.Process(target=run_worker, args=(str(tmp_path),),
+                          kwargs={'poll_interval': 0.05, 'verbose': False}) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=120)
+        assert worker.exitcode == 0
+    
+    assert queue.status() == {'pending': 0, 'running': 0, 'done': 6, 'failed': 0}
+    results = list(queue.results())
+    assert {job['id'] for job, _ in results} == ids
+    assert all(len(result['actions']) == 20 for _, result in results)
+
+def test_job_queue_requeues_expired_lease(tmp_path):
+    """Test that jobs with expired leases are retried and eventually failed."""
+    import os
+    from src.job_queue import JobQueue, make_job
+    
+    queue = JobQueue(str(tmp_path), lease_seconds=60, max_attempts=2)
+    jid = queue.submit(make_job('ClassicalRLAgent', 'NewcombEnvironment', 0, episodes=10))
+    
+    for attempt in range(2):
+        job = queue.claim()
+        assert job['id'] == jid and job['attempts'] == attempt
+        assert queue.requeue_expired() == []  # lease still fresh
+        os.utime(tmp_path / 'running' / f'{jid}.json', (0, 0))
+        assert queue.requeue_expired() == [jid]
+    
+    assert queue.status() == {'pending': 0, 'running': 0, 'done': 0, 'failed': 1}
+    
+    # A requeuer that died after taking the job out of running/ does not lose it
+    jid = queue.submit(make_job('ClassicalRLAgent', 'NewcombEnvironment', 1, episodes=10))
+    queue.claim()
+    leftover = tmp_path / 'running' / f'{jid}.json.0123abcd.expired'
+    os.rename(tmp_path / 'running' / f'{jid}.json', leftover)
+    assert queue.requeue_expired() == []
+    os.utime(leftover, (0, 0))
+    assert queue.requeue_expired() == [jid]
+    assert queue.claim()['attempts'] == 1
+    assert not list((tmp_path / 'running').glob('*.expired'))
+
+def test_seed_aggregation_streams_result_files(tmp_path):
+    """Test streamed aggregation matches in-memory statistics across seeds."""
+    import numpy as np
+    from src.aggregation import iter_results, aggregate_results, episode_series
+    from src.utils import save_results
+    
+    rng = np.random.default_rng(0)
+    series = []
+    for seed in range(12):
+        episodes = 30 if seed else 20  # one shorter (early-stopped) run
+        result = {'actions': rng.integers(0, 2, episodes).tolist(),
+                  'rewards': (rng.random(episodes) * 1e6).tolist(),
+                  'agent': 'ib' if seed % 2 else 'classical'}
+        save_results(result, str(tmp_path / f'seed{seed}.pkl'))
+        series.append(episode_series(result, window=5)['reward'])
+    
+    summaries = aggregate_results(iter_results([str(tmp_path)]), window=5, n_bootstrap=500)
+    summary = summaries[None]['reward']
+    
+    full = np.stack([s for s in series if len(s) == 30])[:, 20:]
+    assert summary.n_seeds.tolist() == [12] * 20 + [11] * 10
+    assert np.allclose(summary.mean[20:], full.mean(0))
+    assert np.allclose(summary.std[20:], full.std(0, ddof=1))
+    assert np.allclose(summary.quantiles[0.5][20:], np.median(full, 0), rtol=1e-5)
+    assert np.all(summary.ci_low <= summary.mean) and np.all(summary.mean <= summary.ci_high)
+    
+    grouped = aggregate_results(iter_results([str(tmp_path)]), window=5,
+                                group_by=lambda meta: meta['path'].endswith(('/seed1.pkl', '/seed3.pkl')))
+    assert grouped[True]['one_box_rate'].n_seeds.max() == 2
+
+def test_seed_aggregator_reservoir_per_episode():
+    """Test quantile bands stay defined when more seeds than samples have unequal lengths."""
+    import warnings
+    import numpy as np
+    from src.aggregation import SeedAggregator
+    
+    rng = np.random.default_rng(0)
+    long_runs = rng.random((3, 30))
+    aggregator = SeedAggregator(max_samples=4, n_bootstrap=50)
+    for run in long_runs:
+        aggregator.add(run)
+    for _ in range(200):
+        aggregator.add(rng.random(10) + 10)
+    
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        summary = aggregator.summary()
+    assert summary.n_seeds.tolist() == [203] * 10 + [3] * 20
+    for level, band in summary.quantiles.items():
+        assert not np.isnan(band).any()
+        assert np.allclose(band[10:], np.quantile(long_runs[:, 10:], level, axis=0), rtol=1e-5)
+    # Early episodes are dominated by the 200 short runs
+    assert np.all(summary.quantiles[0.5][:10] > 9)
+
+def test_report_rendering_skips_unchanged_figures(tmp_path):
+    """Test headless report rendering with a content-hash cache."""
+    import pickle
+    from src.job_queue import JobQueue, make_job, run_job
+    from src.reporting import render_report
+    
+    queue = JobQueue(str(tmp_path / 'queue'))
+    for accuracy in [0.8, 0.9]:
+        for agent_type in ['InfrabayesianRLAgent', 'ClassicalRLAgent']:
+            for seed in range(2):
+                queue.submit(make_job(agent_type, 'NewcombEnvironment', seed, episodes=15,
+                                      env_kwargs={'predictor_accuracy': accuracy}))
+    while (job := queue.claim()) is not None:
+        queue.complete(job['id'], job, run_job(job))
+    
+    output = tmp_path / 'report'
+    rendered = render_report(str(tmp_path / 'queue'), str(output), workers=1, window=5, dpi=20)
+    assert len(rendered) == 2
+    assert (output / 'index.html').exists()
+    assert all((output / f'{name}.png').exists() for name in rendered)
+    
+    assert render_report(str(tmp_path / 'queue'), str(output), workers=1, window=5, dpi=20) == []
+    
+    # Changing one input re-renders only the figure that uses it
+    result_file = next((tmp_path / 'queue' / 'results').iterdir())
+    entry = pickle.loads(result_file.read_bytes())
+    entry['result']['rewards'][0] += 1.0
+    result_file.write_bytes(pickle.dumps(entry))
+    assert len(render_report(str(tmp_path / 'queue'), str(output), workers=1, window=5, dpi=20)) == 1
+
+def test_in_process_rendering_keeps_pyplot_backend(tmp_path):
+    """Test that rendering in the caller's process never switches its backend."""
+    import subprocess
+    import sys
+    code = ("import matplotlib; matplotlib.use('svg'); import sys; "
+            "from src.job_queue import JobQueue, make_job, run_job; "
+            "from src.reporting import render_report; "
+            f"q = JobQueue({str(tmp_path / 'queue')!r}); "
+            "q.submit(make_job('ClassicalRLAgent', 'NewcombEnvironment', 0, episodes=10)); "
+            "job = q.claim(); q.complete(job['id'], job, run_job(job)); "
+            f"render_report(q.root, {str(tmp_path / 'report')!r}, workers=1, window=5, dpi=20); "
+            "assert matplotlib.get_backend() == 'svg', matplotlib.get_backend(); "
+            "assert 'matplotlib.pyplot' not in sys.modules")
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+def test_training_modules_do_not_import_matplotlib():
+    """Test that the training code paths never load matplotlib."""
+    import subprocess
+    import sys
+    code = ("import sys, src, src.job_queue, src.hyperparameter_search, src.aggregation; "
+            "assert 'matplotlib' not in sys.modules")
+    subprocess.run([sys.executable, '-c', code], check=True)
+
+def test_telemetry_textfile_and_http(tmp_path):
+    """Test that telemetry is exported to a textfile and over HTTP."""
+    import urllib.request
+    from src.telemetry import TelemetrySink
+    
+    agent = InfrabayesianRLAgent(actions=[0, 1], epsilon=0.1)
+    env = NewcombEnvironment(predictor_accuracy=0.9)
+    textfile = tmp_path / 'ibrl.prom'
+    with TelemetrySink('seed0', textfile=str(textfile), port=0, interval=0.0) as sink:
+        results = run_experiment(agent, env, episodes=50, verbose=False, telemetry=sink)
+        text = textfile.read_text()
+        assert 'ibrl_episodes_total{run="seed0"} 50' in text
+        assert 'ibrl_q_value_spread{run="seed0"}' in text
+        one_box_rate = sum(a == 0 for a in results['actions']) / 50
+        assert f'ibrl_one_box_rate{{run="seed0"}} {one_box_rate!r}' in text
+        
+        with urllib.request.urlopen(f'http://127.0.0.1:{sink.port}/metrics') as response:
+            assert response.read().decode() == text
+
+def test_prometheus_format_is_exact():
+    """Test counters stay integral, gauges keep full precision and labels are escaped."""
+    from src.telemetry import format_prometheus
+    text = format_prometheus({'a"b\\c\nd': {'episodes_total': 1234567, 'mean_reward': 1 / 3}})
+    assert 'ibrl_episodes_total{run="a\\"b\\\\c\\nd"} 1234567\n' in text
+    assert 'ibrl_mean_reward{run="a\\"b\\\\c\\nd"} 0.3333333333333333\n' in text
@@ -24,3 +24,106 @@ def test_monte_carlo_convergence():
     # Should converge to 1 for E[X^2] with N(0,1)
     result = monte_carlo_expectation(mu, lambda x: x**2, n=10000)
     assert abs(result.item() - 1.0) < 0.1
+
+def test_condition_matches_update_rule():
+    """Test the infrabayesian update against its defining equation."""
+    from src.infradistribution import InfraPolytope
+    th.manual_seed(0)
+    
+    # 3 measures in the credal set, 4 independent belief streams, 5 outcomes
+    probs = th.rand(3, 4, 5, dtype=th.float64)
+    probs = probs / probs.sum(-1, keepdim=True)
+    event = th.rand(4, 5) < 0.5
+    event[:, 0] = True
+    g = th.rand(5, dtype=th.float64)
+    values = th.rand(5, dtype=th.float64)
+    f = lambda x: values[x]
+    
+    prior = InfraPolytope(thd.Categorical(probs))
+    L = event.double()
+    blended = lambda x: L[..., x] * f(x) + (1 - L[..., x]) * g[x]
+    low = prior(lambda x: (1 - L[..., x]) * g[x])
+    high = prior(lambda x: L[..., x] + (1 - L[..., x]) * g[x])
+    
+    unnormalized = InfraPolytope(thd.Categorical(probs)).condition(event, g, normalize=False)
+    assert th.allclose(unnormalized(f), prior(blended))
+    posterior = InfraPolytope(thd.Categorical(probs)).condition(event, g)
+    assert th.allclose(posterior(f), (prior(blended) - low) / (high - low))
+    assert th.allclose(posterior(lambda x: th.zeros_like(x, dtype=th.float64)), th.zeros(4, dtype=th.float64))
+    assert th.allclose(posterior(lambda x: th.ones_like(x, dtype=th.float64)), th.ones(4, dtype=th.float64))
+    
+    # A single measure reduces to Bayesian conditioning
+    bayes = InfraPolytope(thd.Categorical(probs[:1])).condition(event, g)
+    expected = (probs[0] * L * f(th.arange(5))).sum(-1) / (probs[0] * L).sum(-1)
+    assert th.allclose(bayes(f), expected)
+
+def test_condition_sequential_and_bernoulli():
+    """Test that sequential updates equal one update on the intersection."""
+    from src.infradistribution import InfraPolytope
+    th.manual_seed(0)
+    probs = th.rand(3, 6, dtype=th.float64)
+    first = th.tensor([1, 1, 1, 1, 0, 0])
+    second = th.tensor([0, 1, 1, 1, 1, 0])
+    f = lambda x: x.double() ** 2
+    
+    sequential = InfraPolytope(thd.Categorical(probs)).condition(first, 2.0).condition(second, 2.0)
+    once = InfraPolytope(thd.Categorical(probs)).condition(first * second, 2.0)
+    assert th.allclose(sequential(f), once(f))
+    
+    # Bernoulli outcome 1 observed; the worst case was p = 0.8
+    predictor = InfraPolytope(thd.Bernoulli(th.tensor([0.8, 0.9], dtype=th.float64)))
+    predictor.condition(th.tensor([0.0, 1.0]), off_event_utility=1.0)
+    assert th.allclose(predictor(lambda x: x), th.tensor(1.0, dtype=th.float64))
+    with pytest.raises(NotImplementedError):
+        InfraPolytope(thd.Normal(th.zeros(2), th.ones(2))).condition(th.ones(2))
+
+def test_lazy_sa_measure_expressions_fuse_quadrature():
+    """Test that combined sa-measures match eager evaluation with one quadrature per family."""
+    from src import InfraPolytope, Profiler, SaMeasure, mixture
+    th.manual_seed(0)
+    f = lambda x: x.double() ** 2 + 1
+    
+    a = SaMeasure(thd.Normal(th.tensor([0.0, 1.0]), th.tensor([1.0, 2.0])), th.tensor(2.0), th.tensor(1.0))
+    b = SaMeasure(thd.Normal(0.5, 0.3))
+    c = SaMeasure(thd.Bernoulli(th.tensor(0.3)))
+    d = SaMeasure(thd.Categorical(th.tensor([0.2, 0.3, 0.5])), bias=th.tensor(-1.0))
+    expr = (a + b) * 3.0 + c + a * 0.5 + d + 1.0
+    assert expr.batch_shape == (2,)
+    
+    profiler = Profiler()
+    with profiler:
+        value = expr(f)
+    assert profiler.to_dict()['calls']['gauss_hermite_quadrature'] == 1
+    assert th.allclose(value, 3.5 * a(f) + 3 * b(f) + c(f) + d(f) + 1.0)
+    
+    # Composite credal set: 8 mixtures of the same 100 components
+    components = [SaMeasure(thd.Normal(th.randn(()), th.rand(()) + 0.1)) for _ in range(100)]
+    weights = th.rand(8, 100)
+    weights = weights / weights.sum(-1, keepdim=True)
+    credal_set = InfraPolytope(mixture(components, weights))
+    with profiler:
+        lower = credal_set(f)
+    assert profiler.to_dict()['calls']['gauss_hermite_quadrature'] == 2
+    expected = sum(weights[:, j] * m(f) for j, m in enumerate(components)).min()
+    assert th.allclose(lower.float(), expected)
+    with pytest.raises(NotImplementedError):
+        credal_set.entropy()
+
+def test_sa_measure_algebra_with_scalars_on_either_side():
+    """Test reflected and integer scalar operations and summing many measures."""
+    from src import SaMeasure, SaMeasureExpr
+    f = lambda x: x ** 2
+    m = SaMeasure(thd.Normal(0.0, 1.0))
+    
+    assert th.allclose((2.0 * m)(f), 2 * m(f))
+    assert th.allclose((3 * m)(f), 3 * m(f))
+    assert th.allclose((m + 1)(f), m(f) + 1)
+    assert th.allclose((1.0 + m)(f), m(f) + 1)
+    
+    measures = [SaMeasure(thd.Normal(float(i), 1.0)) for i in range(50)]
+    total = sum(measures)
+    assert isinstance(total, SaMeasureExpr)
+    assert th.allclose(total(f), sum(m(f) for m in measures))
+    assert th.allclose((0.5 * total + 1)(f), 0.5 * total(f) + 1)
+    with pytest.raises(TypeError):
+        SaMeasureExpr()